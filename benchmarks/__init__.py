@@ -0,0 +1,5 @@
+"""Headless-бенчмарки сервисов imgviewer (transforms, histogram, metadata).
+
+Запуск: python -m benchmarks --help
+Tk и дисплей не нужны — импортируются только imgviewer.services.
+"""
@@ -0,0 +1,73 @@
+from __future__ import annotations
+import argparse
+import os
+import sys
+
+from benchmarks.images import MODES
+from benchmarks import runner
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def _parse_args(argv):
+    p = argparse.ArgumentParser(prog="python -m benchmarks",
+                                description="Headless-бенчмарк transforms/histogram/metadata.")
+    p.add_argument("--sizes", type=float, nargs="+", default=list(runner.DEFAULT_SIZES),
+                   help="размеры в мегапикселях (по умолчанию: %(default)s)")
+    p.add_argument("--full", action="store_true",
+                   help=f"полный набор размеров {list(runner.FULL_SIZES)} МП")
+    p.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    p.add_argument("--kernels", type=int, nargs="+", default=list(runner.DEFAULT_KERNELS))
+    p.add_argument("--ops", nargs="+", default=None,
+                   help="фильтр операций: 'morph_apply', 'filter_apply.median', 'rotate', ...")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default="bench_results.json", help="куда записать результаты (JSON)")
+    p.add_argument("--baseline", default=DEFAULT_BASELINE, help="база для сравнения (JSON)")
+    p.add_argument("--save-baseline", action="store_true", help="записать результаты как новую базу")
+    p.add_argument("--tolerance", type=float, default=0.15,
+                   help="допустимое замедление относительно базы (доля, по умолчанию %(default)s)")
+    return p.parse_args(argv)
+
+
+def _print_result(r: runner.Result) -> None:
+    if r.error:
+        print(f"{r.name:<48} пропуск: {r.error}")
+        return
+    print(f"{r.name:<48} {r.seconds * 1000:10.1f} мс {r.mpix_per_s:9.1f} МП/с "
+          f"{r.peak_bytes / 2**20:9.1f} МБ")
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    sizes = list(runner.FULL_SIZES) if args.full else args.sizes
+    cases = runner.build_cases(sizes, args.modes, args.kernels, args.ops)
+    if not cases:
+        print("Нет подходящих случаев.", file=sys.stderr)
+        return 2
+
+    results = runner.run(cases, repeat=args.repeat, seed=args.seed, progress=_print_result)
+    runner.save(args.out, results)
+    print(f"\nРезультаты: {args.out}")
+
+    if args.save_baseline:
+        runner.save(args.baseline, results)
+        print(f"База обновлена: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Базы нет ({args.baseline}) — сравнение пропущено.")
+        return 0
+
+    rows = runner.compare(results, runner.load(args.baseline), tolerance=args.tolerance)
+    regressions = [row for row in rows if row["regression"]]
+    print(f"\nСравнение с базой: {len(rows)} случаев, регрессий: {len(regressions)}")
+    for row in rows:
+        mark = "  <-- регрессия" if row["regression"] else ""
+        print(f"{row['name']:<48} {row['baseline_s'] * 1000:10.1f} -> {row['current_s'] * 1000:10.1f} мс "
+              f"(x{row['ratio']:.2f}){mark}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+from __future__ import annotations
+import numpy as np
+from PIL import Image
+
+# Детерминированные синтетические изображения: плавный градиент + шум с фиксированным seed,
+# чтобы у фильтров/гистограмм была «живая» статистика, а результаты были воспроизводимы.
+
+MODES = ("L", "RGB", "RGBA", "I;16")
+
+__all__ = ["MODES", "dims_for", "synthetic"]
+
+
+def dims_for(megapixels: float, aspect: float = 1.5) -> tuple[int, int]:
+    """(w, h) с заданным числом мегапикселей и соотношением сторон 3:2."""
+    n = max(1, int(round(megapixels * 1_000_000)))
+    h = max(1, int(round((n / aspect) ** 0.5)))
+    w = max(1, n // h)
+    return w, h
+
+
+def synthetic(megapixels: float, mode: str, seed: int = 0) -> Image.Image:
+    if mode not in MODES:
+        raise ValueError(f"Unsupported benchmark mode: {mode}")
+    w, h = dims_for(megapixels)
+    rng = np.random.default_rng(seed)
+    y = np.arange(h, dtype=np.float32)[:, None] / max(1, h - 1)
+    x = np.arange(w, dtype=np.float32)[None, :] / max(1, w - 1)
+
+    if mode == "I;16":
+        base = (x * 0.7 + y * 0.3) * 60000.0
+        noise = rng.normal(0.0, 800.0, size=(h, w)).astype(np.float32)
+        arr = np.clip(base + noise, 0, 65535).astype(np.uint16)
+        return Image.fromarray(arr, mode="I;16")
+
+    bands = {"L": 1, "RGB": 3, "RGBA": 4}[mode]
+    planes = []
+    for c in range(bands):
+        base = ((x * (0.5 + 0.2 * c) + y * (0.5 - 0.1 * c)) * 230.0).astype(np.float32)
+        noise = rng.integers(-12, 13, size=(h, w), dtype=np.int16)
+        planes.append(np.clip(base + noise, 0, 255).astype(np.uint8))
+    arr = planes[0] if bands == 1 else np.stack(planes, axis=2)
+    return Image.fromarray(arr, mode=mode)
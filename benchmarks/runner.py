@@ -0,0 +1,197 @@
+from __future__ import annotations
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, List, Optional
+
+import cv2
+import numpy as np
+import PIL
+from PIL import Image
+
+from imgviewer.services import transforms as Sx
+from imgviewer.services.histogram import histogram_data, invalidate_histogram, sampled_histogram
+from imgviewer.services.metadata import describe
+from benchmarks.images import synthetic
+
+FILTER_OPS = ("sharpen", "emboss", "motion", "median", "custom")
+MORPH_OPS = ("erosion", "dilation", "opening", "closing", "gradient", "tophat", "blackhat")
+OTHER_OPS = ("adjust_bsc", "bw_levels", "rotate", "histogram_data", "sampled_histogram", "describe")
+
+DEFAULT_SIZES = (1.0, 4.0)
+FULL_SIZES = (1.0, 4.0, 12.0, 24.0, 50.0, 100.0)
+DEFAULT_KERNELS = (3, 9, 31)
+
+__all__ = ["Case", "Result", "FILTER_OPS", "MORPH_OPS", "OTHER_OPS",
+           "DEFAULT_SIZES", "FULL_SIZES", "DEFAULT_KERNELS",
+           "build_cases", "run_case", "run", "compare", "load", "save"]
+
+
+@dataclass
+class Case:
+    name: str               # ключ для сравнения с базой
+    op: str                 # 'filter_apply.median', 'morph_apply.erosion', 'rotate', ...
+    mode: str
+    megapixels: float
+    kernel: Optional[int]
+    fn: Callable[[Image.Image], object]
+
+
+@dataclass
+class Result:
+    name: str
+    op: str
+    mode: str
+    megapixels: float
+    kernel: Optional[int]
+    seconds: Optional[float]        # лучшее время из повторов
+    median_seconds: Optional[float]
+    mpix_per_s: Optional[float]
+    peak_bytes: Optional[int]       # пик по tracemalloc в отдельном прогоне (буферы NumPy; C-память PIL/OpenCV не видна)
+    error: Optional[str] = None
+
+
+def _filter_mode(mode: str) -> str:
+    return "RGB" if mode in ("RGB", "RGBA") else "L"
+
+
+def _selected(label: str, wanted: Optional[set]) -> bool:
+    """Фильтр --ops: полное имя ('morph_apply.erosion'), префикс ('morph_apply') или операция ('erosion')."""
+    if not wanted:
+        return True
+    return any(label == w or label.startswith(w + ".") or label.rsplit(".", 1)[-1] == w for w in wanted)
+
+
+def build_cases(sizes: Iterable[float], modes: Iterable[str], kernels: Iterable[int],
+                ops: Optional[Iterable[str]] = None) -> List[Case]:
+    wanted = set(ops) if ops else None
+    kernels = [int(k) | 1 for k in kernels]   # только нечётные, как в диалогах
+    cases: List[Case] = []
+
+    def add(label, mode, mp, k, fn):
+        if _selected(label, wanted):
+            name = f"{label}/{mode}/{mp:g}MP" + (f"/k{k}" if k else "")
+            cases.append(Case(name, label, mode, mp, k, fn))
+
+    for mp in sizes:
+        for mode in modes:
+            fm = _filter_mode(mode)
+            for op in ("sharpen", "emboss"):
+                add(f"filter_apply.{op}", mode, mp, None,
+                    lambda im, op=op, fm=fm: Sx.filter_apply(im, op, None, fm, False))
+            for k in kernels:
+                add("filter_apply.motion", mode, mp, k,
+                    lambda im, k=k, fm=fm: Sx.filter_apply(im, "motion", None, fm, False,
+                                                           {"motion_len": k, "motion_angle": 30.0}))
+                add("filter_apply.median", mode, mp, k,
+                    lambda im, k=k, fm=fm: Sx.filter_apply(im, "median", None, fm, False, {"median_size": k}))
+                box = np.ones((k, k), dtype=np.float32)
+                add("filter_apply.custom", mode, mp, k,
+                    lambda im, box=box, fm=fm: Sx.filter_apply(im, "custom", box, fm, True))
+                ellipse = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (k, k))
+                for op in MORPH_OPS:
+                    add(f"morph_apply.{op}", mode, mp, k,
+                        lambda im, op=op, e=ellipse, fm=fm: Sx.morph_apply(im, op, e, 1, fm))
+            add("adjust_bsc", mode, mp, None, lambda im: Sx.adjust_bsc(im, 1.2, 0.8, 1.1))
+            add("bw_levels", mode, mp, None, lambda im: Sx.bw_levels(im, 20, 230, 1.2))
+            add("rotate", mode, mp, None, lambda im: Sx.rotate(im, 17.0))
+            # гистограммы запоминаются по изображению — каждый повтор считаем заново
+            add("histogram_data", mode, mp, None,
+                lambda im: (invalidate_histogram(im), histogram_data(im)))
+            add("sampled_histogram", mode, mp, None,
+                lambda im: (invalidate_histogram(im), sampled_histogram(im)))
+            add("describe", mode, mp, None, lambda im: describe(im, path=None, icc_profile=None))
+    return cases
+
+
+def _peak_bytes(case: Case, img: Image.Image) -> int:
+    """Отдельный прогон под tracemalloc: трассировка замедляет каждую аллокацию,
+    поэтому время в нём не измеряется."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        case.fn(img)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(case: Case, img: Image.Image, repeat: int = 3) -> Result:
+    times: List[float] = []
+    try:
+        for _ in range(max(1, repeat)):
+            gc.collect()
+            t0 = time.perf_counter()
+            case.fn(img)
+            times.append(time.perf_counter() - t0)
+        peak = _peak_bytes(case, img)
+    except Exception as e:   # режим может не поддерживаться операцией — фиксируем и идём дальше
+        return Result(case.name, case.op, case.mode, case.megapixels, case.kernel,
+                      None, None, None, None, error=f"{type(e).__name__}: {e}")
+    best = min(times)
+    pixels = img.size[0] * img.size[1]
+    return Result(case.name, case.op, case.mode, case.megapixels, case.kernel,
+                  best, statistics.median(times), pixels / 1e6 / best if best > 0 else None, peak)
+
+
+def run(cases: List[Case], repeat: int = 3, seed: int = 0,
+        progress: Optional[Callable[[Result], None]] = None) -> List[Result]:
+    results: List[Result] = []
+    images: Dict[tuple, Image.Image] = {}
+    for case in cases:
+        key = (case.megapixels, case.mode)
+        if key not in images:
+            images.clear()   # держим в памяти одно синтетическое изображение
+            images[key] = synthetic(case.megapixels, case.mode, seed=seed)
+        res = run_case(case, images[key], repeat=repeat)
+        results.append(res)
+        if progress:
+            progress(res)
+    return results
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "pillow": PIL.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save(path: str, results: List[Result]) -> None:
+    data = {"environment": environment(), "results": [asdict(r) for r in results]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def load(path: str) -> Dict[str, dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {r["name"]: r for r in data.get("results", [])}
+
+
+def compare(results: List[Result], baseline: Dict[str, dict], tolerance: float = 0.15) -> List[dict]:
+    """Сравнить с базой по лучшему времени. ratio > 1 + tolerance — регрессия."""
+    rows = []
+    for r in results:
+        base = baseline.get(r.name)
+        if not base or base.get("seconds") is None or r.seconds is None:
+            continue
+        ratio = r.seconds / base["seconds"] if base["seconds"] > 0 else float("inf")
+        rows.append({
+            "name": r.name,
+            "baseline_s": base["seconds"],
+            "current_s": r.seconds,
+            "ratio": ratio,
+            "regression": ratio > 1.0 + tolerance,
+        })
+    return rows
+
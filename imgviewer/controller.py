@@ -1,7 +1,7 @@
 from __future__ import annotations
 from PIL import Image
 from imgviewer.model import Model
-from imgviewer.services import io as Sio, metadata as Smeta, transforms as Sx
+from imgviewer.services import io as Sio, metadata as Smeta, stats as Sstats, transforms as Sx
 import numpy as np
 
 class Controller:
@@ -13,6 +13,7 @@ class Controller:
         img, exif, icc = Sio.open_image(path)
         self.m.original = img.copy()
         self.m.current = img
+        self.m.current_scale = 1.0
         self.m.path = path
         self.m.exif_bytes = exif
         self.m.icc_profile = icc
@@ -27,9 +28,19 @@ class Controller:
         self.m.path = path
 
     def info_text(self) -> str:
-        return "" if self.m.current is None else Smeta.describe(
-            self.m.current, path=self.m.path, icc_profile=self.m.icc_profile
-        )
+        if self.m.current is None:
+            return ""
+        text = Smeta.describe(self.m.current, path=self.m.path, icc_profile=self.m.icc_profile)
+        if self.m.current_scale < 1.0:
+            text += f"\n\nПредпросмотр: уменьшенная копия (масштаб {self.m.current_scale:.2f})"
+        return text
+
+    def stats_text(self) -> str:
+        """Статистика по каналам (точная; во время предпросмотра не пересчитывается)."""
+        if self.m.current is None:
+            return ""
+        stats = Sstats.image_stats(self.m.current)
+        return "Статистика по каналам:\n" + "\n".join(Sstats.stats_lines(stats))
 
     # гистограмма
     def hist_image(self, kind: str):
@@ -55,6 +66,7 @@ class Controller:
             return False
         self.m.history.push(self.m.current)   # теперь это вызовет History.push()
         self.m.current = new_im
+        self.m.current_scale = 1.0
         return True
 
     def apply_filters(self, op: str, kernel, mode: str, normalize: bool, extra: dict) -> bool:
@@ -67,6 +79,7 @@ class Controller:
         if prev is None:
             return False
         self.m.current = prev
+        self.m.current_scale = 1.0
         return True
 
     def redo(self) -> bool:
@@ -76,6 +89,7 @@ class Controller:
         if nxt is None:
             return False
         self.m.current = nxt
+        self.m.current_scale = 1.0
         return True
 
     def reset(self) -> bool:
@@ -83,18 +97,23 @@ class Controller:
             return False
         self.m.history.clear()
         self.m.current = self.m.original
+        self.m.current_scale = 1.0
         return True
 
     # предпросмотры
-    def set_temp_image(self, img: Image.Image) -> None:
-        """Установить временное изображение без записи в историю (для живого предпросмотра)."""
+    def set_temp_image(self, img: Image.Image, scale: float = 1.0) -> None:
+        """Установить временное изображение без записи в историю (для живого предпросмотра).
+        scale < 1 — img это уменьшенная копия (см. services.preview)."""
         self.m.current = img
+        self.m.current_scale = float(scale)
 
     def preview_original_start(self) -> bool:
         if self.m.original is None or self.m.current is None or self.m.preview_active:
             return False
         self.m.preview_saved = self.m.current
+        self.m.preview_saved_scale = self.m.current_scale
         self.m.current = self.m.original
+        self.m.current_scale = 1.0
         self.m.preview_active = True
         return True
 
@@ -102,6 +121,7 @@ class Controller:
         if not self.m.preview_active:
             return False
         self.m.current = self.m.preview_saved
+        self.m.current_scale = self.m.preview_saved_scale
         self.m.preview_saved = None
         self.m.preview_active = False
         return True
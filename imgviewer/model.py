@@ -13,6 +13,10 @@ class Model:
     icc_profile: Optional[bytes] = None
     history: History = field(default_factory=lambda: History(maxlen=100))  # <-- вот так
 
+    # масштаб current относительно исходного разрешения (< 1 — уменьшенный предпросмотр)
+    current_scale: float = 1.0
+
     # показать оригинал
     preview_saved: Optional[Image.Image] = None
+    preview_saved_scale: float = 1.0
     preview_active: bool = False
@@ -1,3 +1,4 @@
-from . import transforms, metadata, histogram, io, history
+from . import transforms, convolution, median, morphology, tiling, metadata, histogram, io, history, preview, pyramid, stats
+# probe не импортируется здесь: это ещё и CLI (python -m imgviewer.services.probe)
 
-__all__ = ["transforms", "metadata", "histogram", "io", "history"]
\ No newline at end of file
+__all__ = ["transforms", "convolution", "median", "morphology", "tiling", "metadata", "histogram", "io", "history", "preview", "pyramid", "stats"]
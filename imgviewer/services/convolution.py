@@ -0,0 +1,280 @@
+from __future__ import annotations
+import numpy as np
+import cv2
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Движок свёртки: «same»-выход, зеркальная рамка (reflect-101), ядро без переворота
+# (корреляция) — так же, как в эталонном transforms._convolve2d_single.
+
+BACKENDS = ("cv2", "strided", "direct", "fft", "separable")
+
+# Площадь ядра (kh*kw), начиная с которой 'auto' выбирает FFT. filter2D сам переходит
+# на DFT примерно с 11×11 и в замерах (1024², ядра 7..383, NumPy pocketfft) оставался
+# в 2–8 раз быстрее блочного FFT, поэтому по умолчанию порог недостижим и FFT
+# используется только явно (backend='fft'). Понизьте, если на вашей сборке выходит иначе.
+FFT_CROSSOVER_AREA = 1 << 30
+
+# Допуск при поиске разложения ядра (относительно max|k|)
+SEPARABLE_TOL = 1e-6
+
+# Сколько элементов промежуточного буфера (float32/int16) держать за раз в convolve_u8
+STRIP_ELEMENTS = 1 << 22
+
+__all__ = ["BACKENDS", "FFT_CROSSOVER_AREA", "SEPARABLE_TOL", "STRIP_ELEMENTS",
+           "analyze_kernel", "convolve2d", "convolve_u8", "pick_backend", "plan_convolution"]
+
+
+def _reflect_pad(channel: np.ndarray, kh: int, kw: int) -> np.ndarray:
+    pad_y, pad_x = kh // 2, kw // 2
+    return np.pad(channel, ((pad_y, pad_y), (pad_x, pad_x)), mode="reflect")
+
+
+def _conv_cv2(channel: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """OpenCV filter2D (это корреляция, как и эталон). BORDER_REFLECT_101 == np.pad(mode='reflect')."""
+    return cv2.filter2D(channel, cv2.CV_32F, kernel, borderType=cv2.BORDER_REFLECT_101)
+
+
+def _conv_strided(channel: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """Окна через stride-tricks (без копирования) + einsum."""
+    kh, kw = kernel.shape
+    padded = _reflect_pad(channel, kh, kw)
+    h, w = channel.shape
+    win = sliding_window_view(padded, (kh, kw))[:h, :w]
+    return np.einsum("ijkl,kl->ij", win, kernel).astype(np.float32, copy=False)
+
+
+def _conv_direct(channel: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """Сумма сдвинутых срезов: по одному проходу на ненулевой элемент ядра."""
+    kh, kw = kernel.shape
+    padded = _reflect_pad(channel, kh, kw)
+    h, w = channel.shape
+    out = np.zeros((h, w), dtype=np.float32)
+    tmp = np.empty_like(out)
+    for i in range(kh):
+        for j in range(kw):
+            v = kernel[i, j]
+            if v == 0:
+                continue
+            np.multiply(padded[i:i + h, j:j + w], v, out=tmp)
+            out += tmp
+    return out
+
+
+def _fft_block(kh: int, kw: int) -> tuple[int, int]:
+    """Размер блока overlap-add: заметно больше ядра, чтобы перекрытие было дешёвым,
+    и такой, чтобы размер FFT (блок + ядро - 1) был «быстрым»."""
+    def fit(k: int) -> int:
+        n = cv2.getOptimalDFTSize(max(256, 4 * k) + k - 1)
+        return n - k + 1
+    return fit(kh), fit(kw)
+
+
+def _reflect_index(n: int, lo: int, hi: int) -> np.ndarray:
+    """Индексы [lo, hi) в канале длины n с зеркальной рамкой reflect-101
+    (и многократным отражением, если рамка шире канала — как у np.pad)."""
+    idx = np.arange(lo, hi)
+    if n == 1:
+        return np.zeros_like(idx)
+    period = 2 * (n - 1)
+    idx = np.abs(idx) % period
+    return np.where(idx >= n, period - idx, idx)
+
+
+def _conv_fft(channel: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """Свёртка в частотной области по выходным блокам (overlap-save): для каждого блока
+    вырезается его окно с рамкой, после обратного FFT «чистая» часть пишется прямо
+    в выходной float32. Кроме выхода, в памяти только одно окно и его спектр —
+    размер блока зависит от ядра, но не от картинки."""
+    kh, kw = kernel.shape
+    h, w = channel.shape
+    pad_y, pad_x = kh // 2, kw // 2
+    bh, bw = _fft_block(kh, kw)
+    # маленькая картинка — не раздуваем FFT до полного блока
+    fh = cv2.getOptimalDFTSize(min(bh, h) + kh - 1)
+    fw = cv2.getOptimalDFTSize(min(bw, w) + kw - 1)
+    bh, bw = fh - kh + 1, fw - kw + 1
+
+    # корреляция = свёртка с перевёрнутым ядром
+    kspec = np.fft.rfft2(kernel[::-1, ::-1].astype(np.float64), s=(fh, fw))
+    out = np.empty((h, w), dtype=np.float32)
+    for y in range(0, h, bh):
+        oh = min(bh, h - y)
+        ry = _reflect_index(h, y - pad_y, y + oh + kh - 1 - pad_y)
+        for x in range(0, w, bw):
+            ow = min(bw, w - x)
+            rx = _reflect_index(w, x - pad_x, x + ow + kw - 1 - pad_x)
+            win = channel[ry[:, None], rx]
+            full = np.fft.irfft2(np.fft.rfft2(win, s=(fh, fw)) * kspec, s=(fh, fw))
+            # первые k-1 строк/столбцов испорчены циклическим переносом, дальше — «valid»
+            out[y:y + oh, x:x + ow] = full[kh - 1:kh - 1 + oh, kw - 1:kw - 1 + ow]
+    return out
+
+
+def _rank1_exact(kernel: np.ndarray, tol: float):
+    """Точное разложение k = col ⊗ row через опорный элемент (без SVD):
+    для целых/двоичных ядер множители получаются без ошибок округления."""
+    i, j = np.unravel_index(int(np.argmax(np.abs(kernel))), kernel.shape)
+    pivot = float(kernel[i, j])
+    if pivot == 0.0:
+        return None
+    row = kernel[i, :].astype(np.float64)
+    col = kernel[:, j].astype(np.float64) / pivot
+    if np.abs(np.outer(col, row) - kernel).max() > tol * abs(pivot):
+        return None
+    return [(col.astype(np.float32), row.astype(np.float32))]
+
+
+def analyze_kernel(kernel: np.ndarray, *, tol: float = SEPARABLE_TOL,
+                   max_rank: int | None = None) -> list[tuple[np.ndarray, np.ndarray]] | None:
+    """Разложение ядра в сумму r внешних произведений (столбец ⊗ строка).
+    Возвращает список пар (col, row) или None, если ядро неразделимо либо
+    r проходов по строкам/столбцам не дешевле полной 2D свёртки (r*(kh+kw) >= kh*kw)."""
+    kernel = np.asarray(kernel, dtype=np.float64)
+    kh, kw = kernel.shape
+    if kh == 1 or kw == 1:
+        return None  # уже одномерное
+    scale = float(np.abs(kernel).max())
+    if scale == 0.0:
+        return None
+
+    terms = _rank1_exact(kernel, tol)
+    if terms is not None:
+        return terms if (kh + kw) < kh * kw else None
+
+    u, sv, vt = np.linalg.svd(kernel)
+    limit = (kh * kw - 1) // (kh + kw)
+    if max_rank is not None:
+        limit = min(limit, int(max_rank))
+    for r in range(2, limit + 1):
+        approx = (u[:, :r] * sv[:r]) @ vt[:r]
+        if np.abs(approx - kernel).max() <= tol * scale:
+            return [((u[:, t] * sv[t]).astype(np.float32), vt[t].astype(np.float32))
+                    for t in range(r)]
+    return None
+
+
+def _conv_separable(channel: np.ndarray, kernel: np.ndarray,
+                    terms: list[tuple[np.ndarray, np.ndarray]] | None = None) -> np.ndarray:
+    """Сумма r раздельных проходов (строка, затем столбец): O(k·r) на пиксель вместо O(k²).
+    terms — готовое разложение из analyze_kernel (иначе считается здесь)."""
+    if terms is None:
+        terms = analyze_kernel(kernel)
+    if terms is None:
+        return _conv_cv2(channel, kernel)
+    out = None
+    for col, row in terms:
+        part = cv2.sepFilter2D(channel, cv2.CV_32F, row, col, borderType=cv2.BORDER_REFLECT_101)
+        out = part if out is None else cv2.add(out, part)
+    return out
+
+
+_BACKEND_FN = {
+    "cv2": _conv_cv2,
+    "strided": _conv_strided,
+    "direct": _conv_direct,
+    "fft": _conv_fft,
+    "separable": _conv_separable,
+}
+
+
+def plan_convolution(kernel: np.ndarray, backend: str = "auto"
+                     ) -> tuple[str, list[tuple[np.ndarray, np.ndarray]] | None]:
+    """Бэкенд и (для 'separable') разложение ядра — один раз на свёртку,
+    чтобы не повторять SVD в каждой полосе/плитке: передайте terms в convolve2d/convolve_u8."""
+    if backend == "auto":
+        terms = analyze_kernel(kernel)
+        if terms is not None:
+            return "separable", terms
+        return ("fft" if kernel.size >= FFT_CROSSOVER_AREA else "cv2"), None
+    if backend == "separable":
+        return backend, analyze_kernel(kernel)
+    return backend, None
+
+
+def pick_backend(kernel: np.ndarray) -> str:
+    """Выбор бэкенда по ядру: разделимые/низкоранговые — проходами по строкам и столбцам,
+    очень большие — через FFT (FFT_CROSSOVER_AREA), остальные — через OpenCV."""
+    return plan_convolution(kernel)[0]
+
+
+def _per_channel(fn, src: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    out = np.empty(src.shape, dtype=np.float32)
+    for c in range(src.shape[2]):
+        out[:, :, c] = fn(src[:, :, c], kernel)
+    return out
+
+
+def convolve2d(channel: np.ndarray, kernel: np.ndarray, *, backend: str = "auto",
+               terms: list[tuple[np.ndarray, np.ndarray]] | None = None) -> np.ndarray:
+    """2D свёртка (same, зеркальная рамка) -> float32.
+    channel: HxW или HxWxC (каналы обрабатываются независимо).
+    backend: 'auto' | 'cv2' | 'strided' | 'direct' | 'fft' | 'separable'
+    terms: разложение ядра из plan_convolution (для 'separable').
+    """
+    channel = np.asarray(channel, dtype=np.float32)
+    kernel = np.asarray(kernel, dtype=np.float32)
+    if backend == "auto" or (backend == "separable" and terms is None):
+        backend, terms = plan_convolution(kernel, backend)
+    if backend not in _BACKEND_FN:
+        raise ValueError(f"Unknown convolution backend: {backend}")
+    fn = _BACKEND_FN[backend]
+    if backend == "separable":
+        def fn(ch, k):
+            return _conv_separable(ch, k, terms)
+    try:
+        if channel.ndim == 3 and backend in ("strided", "direct", "fft"):
+            return _per_channel(fn, channel, kernel)
+        return fn(channel, kernel)
+    except cv2.error:
+        # OpenCV не принял вход (экзотические размеры) — считаем без него
+        if channel.ndim == 3:
+            return _per_channel(_conv_direct, channel, kernel)
+        return _conv_direct(channel, kernel)
+
+
+def _int16_safe(kernel: np.ndarray) -> bool:
+    """Целочисленное ядро, сумма которого по модулю на 8-битном входе влезает в int16."""
+    return bool(np.all(kernel == np.round(kernel)) and np.abs(kernel).sum() * 255 <= 32767)
+
+
+def _conv_strip(src: np.ndarray, kernel: np.ndarray, backend: str, fixed: bool,
+                terms: list[tuple[np.ndarray, np.ndarray]] | None) -> np.ndarray:
+    if fixed:
+        # фиксированная точка: uint8 -> int16 без промежуточного float-кадра
+        return cv2.filter2D(src, cv2.CV_16S, kernel, borderType=cv2.BORDER_REFLECT_101)
+    return convolve2d(src, kernel, backend=backend, terms=terms)
+
+
+def convolve_u8(src: np.ndarray, kernel: np.ndarray, *, backend: str = "auto",
+                out: np.ndarray | None = None,
+                terms: list[tuple[np.ndarray, np.ndarray]] | None = None) -> np.ndarray:
+    """Свёртка 8-битного HxW / HxWxC буфера (каналы чередуются, все за один вызов) -> uint8.
+    Результат как у эталона: clip(0..255) и отбрасывание дробной части.
+    Промежуточная точность (int16 или float32) держится только для полосы строк,
+    поэтому пик памяти — порядка размера выходного буфера.
+    src может быть видом (например, arr[..., :3]); out — массив того же размера.
+    terms — разложение ядра из plan_convolution (для 'separable').
+    """
+    kernel = np.asarray(kernel, dtype=np.float32)
+    if backend == "auto" or (backend == "separable" and terms is None):
+        backend, terms = plan_convolution(kernel, backend)
+    integral = bool(np.all(kernel == np.round(kernel)))
+    fixed = backend in ("cv2", "separable") and _int16_safe(kernel)
+    if out is None:
+        out = np.empty(src.shape, dtype=np.uint8)
+
+    h = src.shape[0]
+    halo = kernel.shape[0] // 2
+    row_elems = max(1, src.size // max(1, h))
+    step = max(kernel.shape[0], STRIP_ELEMENTS // row_elems)
+    for y0 in range(0, h, step):
+        y1 = min(h, y0 + step)
+        a0, a1 = max(0, y0 - halo), min(h, y1 + halo)
+        res = _conv_strip(src[a0:a1], kernel, backend, fixed, terms)
+        if integral and not fixed:
+            # целое ядро на целом входе даёт целую сумму; FFT/float-проходы дают 33.99999
+            # вместо 34 — округляем, иначе отбрасывание дроби уводит на единицу вниз
+            np.rint(res, out=res)
+        np.clip(res[y0 - a0:y1 - a0], 0, 255, out=res[y0 - a0:y1 - a0])
+        out[y0:y1] = res[y0 - a0:y1 - a0]
+    return out
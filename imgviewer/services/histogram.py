@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from typing import List, Optional, TypedDict, Literal
+import math
+import weakref
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypedDict, Literal, Union
+import numpy as np
+import cv2
 from PIL import Image
 
 class HistogramData(TypedDict):
@@ -9,8 +13,42 @@ class HistogramData(TypedDict):
     R: Optional[List[int]]
     G: Optional[List[int]]
     B: Optional[List[int]]
+    range: Tuple[float, float]   # значения, на которые приходятся крайние из 256 столбцов
+    error: float                 # 0 — точная; иначе граница ошибки доли пикселей (см. sampled_histogram)
+
+_RANGE8 = (0.0, 255.0)
+
+__all__ = ["HistogramData", "histogram_data", "sampled_histogram", "histogram_from_lut",
+           "patched_histogram", "attach_histogram", "invalidate_histogram", "SAMPLE_BUDGET",
+           "SAMPLE_CONFIDENCE"]
+
+# Гистограммы запоминаются по id изображения (запись живёт, пока живо изображение), так что
+# перерисовка панели для того же кадра ничего не считает. Запись хранит (режим, размер) —
+# изменение этих свойств «на месте» (putalpha и т.п.) запись сбрасывает; прочие изменения
+# пикселей на месте нужно отметить invalidate_histogram.
+# Гистограммы, известные заранее: результат точечной операции (таблица v -> lut[v]) имеет
+# гистограмму, которую можно вывести из входной за O(256). Такая гистограмма прикрепляется
+# к изображению-результату через attach_histogram, и кадр не сканируется вовсе. Вместо готовой
+# гистограммы можно прикрепить функцию — она вызовется при первом запросе (предпросмотр области,
+# см. patched_histogram, не тратит время, пока гистограмму никто не смотрит).
+_Lazy = Callable[[], HistogramData]
+_memo: Dict[int, Tuple[str, Tuple[int, int], Union[HistogramData, _Lazy]]] = {}
+# Пока идёт предпросмотр, точная гистограмма не нужна: sampled_histogram берёт каждый k-й
+# пиксель по обеим осям (не больше SAMPLE_BUDGET), стоимость не зависит от размера кадра.
+# Граница ошибки — неравенство Дворецкого–Кифера–Вольфовица: с вероятностью
+# SAMPLE_CONFIDENCE накопленная доля пикселей по выборке отличается от настоящей не больше
+# чем на sqrt(ln(2 / (1 - SAMPLE_CONFIDENCE)) / (2n)).
+SAMPLE_BUDGET = 1 << 16        # пикселей в выборке (~0.5% при 95%)
+SAMPLE_CONFIDENCE = 0.95
+# 16-битные, 32-битные целые и float-кадры (I;16, I, F) не приводятся к 8 битам: гистограмма
+# считается по настоящим значениям в диапазоне [min, max] кадра и сводится к 256 столбцам.
+
+def _rebin(counts: np.ndarray) -> List[int]:
+    """n подряд идущих целочисленных уровней -> 256 столбцов равной ширины (уровень i -> i·256 // n)."""
+    n = len(counts)
+    idx = np.arange(n, dtype=np.int64) * 256 // n
+    return np.bincount(idx, weights=counts, minlength=256).astype(np.int64).tolist()
 
-__all__ = ["HistogramData", "histogram_data"]
 
 def _hist256(h: List[int]) -> List[int]:
     n = len(h)
@@ -18,36 +56,158 @@ def _hist256(h: List[int]) -> List[int]:
         return h
     if n < 256:
         return h + [0] * (256 - n)
+    return _rebin(np.asarray(h, dtype=np.float64))
 
-    bins = [0] * 256
-    ratio = n / 256.0
-    for i, count in enumerate(h):
-        j = int(i / ratio)
-        if j >= 256:
-            j = 255
-        bins[j] += count
-    return bins
 
+def _highbit(img: Image.Image) -> HistogramData:
+    """Гистограмма I;16 / I / F по настоящим значениям."""
+    a = np.asarray(img)
+    if a.dtype.kind == "f":
+        finite = np.isfinite(a)
+        if not finite.all():
+            a = a[finite]   # NaN и бесконечности не рисуем
+        if a.size == 0:
+            return {"mode": "L", "L": [0] * 256, "R": None, "G": None, "B": None, "range": (0.0, 0.0),
+                    "error": 0.0}
+        a = a.astype(np.float32, copy=False)
+        lo, hi = float(a.min()), float(a.max())
+        if hi > lo:
+            # верхняя граница чуть сдвинута, чтобы максимум попал в последний столбец
+            top = float(np.nextafter(np.float32(hi), np.float32(np.inf)))
+            h = cv2.calcHist([a.reshape(-1, 1)], [0], None, [256], [lo, top]).ravel()
+        else:
+            h = np.zeros(256); h[0] = a.size
+        hist = h.astype(np.int64).tolist()
+    elif a.dtype.itemsize <= 2:
+        a = a.astype(np.uint16, copy=False)   # I;16B и т.п. — в родной порядок байт
+        fine = cv2.calcHist([a.reshape(-1, 1)], [0], None, [65536], [0, 65536]).ravel()
+        used = np.flatnonzero(fine)
+        lo, hi = (int(used[0]), int(used[-1])) if used.size else (0, 0)
+        hist = _rebin(fine[lo:hi + 1])
+    else:
+        lo, hi = (int(v) for v in cv2.minMaxLoc(a)[:2])
+        if hi - lo > 0xFFFF:
+            # слишком широкий диапазон для подробной гистограммы — сразу в 256 столбцов
+            idx = ((a.astype(np.int64) - lo) * 256 // (hi - lo + 1)).ravel()
+            hist = np.bincount(idx, minlength=256).tolist()
+        else:
+            fine = cv2.calcHist([(a - lo).astype(np.uint16).reshape(-1, 1)], [0], None,
+                                [hi - lo + 1], [0, hi - lo + 1]).ravel()
+            hist = _rebin(fine)
+    return {"mode": "L", "L": hist, "R": None, "G": None, "B": None, "range": (float(lo), float(hi)),
+            "error": 0.0}
 
-def histogram_data(img: Image.Image) -> HistogramData:
-    if img.mode == "L":
-        return {
-            "mode": "L",
-            "L": _hist256(img.histogram()),
-            "R": None,
-            "G": None,
-            "B": None,
-        }
-
-    rgb = img.convert("RGB")
-    r = _hist256(rgb.getchannel("R").histogram())
-    g = _hist256(rgb.getchannel("G").histogram())
-    b = _hist256(rgb.getchannel("B").histogram())
 
+def _apply_lut(h: List[int], lut: Sequence[int]) -> List[int]:
+    out = [0] * 256
+    for v, count in enumerate(h):
+        out[lut[v]] += count
+    return out
+
+
+def histogram_from_lut(data: HistogramData, lut: Sequence[int]) -> HistogramData:
+    """
+    Гистограмма после точечной операции по гистограмме входа.
+    lut: 256 значений (одна таблица на все каналы) или 768 (R, G, B подряд, как у Image.point).
+    """
+    if data["mode"] == "L":
+        return {"mode": "L", "L": _apply_lut(data["L"], lut[:256]), "R": None, "G": None, "B": None,
+                "range": _RANGE8, "error": data["error"]}
+    per = [lut[i * 256:(i + 1) * 256] for i in range(3)] if len(lut) >= 768 else [lut] * 3
     return {
         "mode": "RGB",
         "L": None,
-        "R": r,
-        "G": g,
-        "B": b,
+        "R": _apply_lut(data["R"], per[0]),
+        "G": _apply_lut(data["G"], per[1]),
+        "B": _apply_lut(data["B"], per[2]),
+        "range": _RANGE8,
+        "error": data["error"],
     }
+
+
+def patched_histogram(base: Image.Image, patch: Image.Image, offset: Tuple[int, int]) -> HistogramData:
+    """
+    Гистограмма base, в который с точки offset вклеен patch того же режима: из гистограммы base
+    (обычно уже известной) вычитается гистограмма закрытой области и прибавляется гистограмма
+    patch — работа пропорциональна площади patch. У I;16 / I / F столбцы зависят от диапазона
+    всего кадра, там кадр собирается целиком.
+    """
+    if base.mode in ("I", "F") or base.mode.startswith("I;16"):
+        whole = base.copy()
+        whole.paste(patch, offset)
+        return _compute(whole)
+    x0, y0 = offset
+    data = dict(histogram_data(base))
+    old = _compute(base.crop((x0, y0, x0 + patch.size[0], y0 + patch.size[1])))
+    new = _compute(patch)
+    for ch in ("L", "R", "G", "B"):
+        if data[ch] is not None:
+            data[ch] = [t - o + n for t, o, n in zip(data[ch], old[ch], new[ch])]
+    return data
+
+
+def attach_histogram(img: Image.Image, data: Union[HistogramData, _Lazy]) -> None:
+    """Запомнить гистограмму изображения (живёт, пока живо изображение).
+    data — готовая гистограмма или функция без аргументов, которая её посчитает при первом запросе."""
+    key = id(img)
+    if key not in _memo:
+        weakref.finalize(img, _memo.pop, key, None)
+    _memo[key] = (img.mode, img.size, data)
+
+
+def invalidate_histogram(img: Image.Image) -> None:
+    """Забыть гистограмму изображения (после изменения его пикселей на месте)."""
+    _memo.pop(id(img), None)
+
+
+def _compute(img: Image.Image) -> HistogramData:
+    if img.mode == "L":
+        return {"mode": "L", "L": _hist256(img.histogram()), "R": None, "G": None, "B": None,
+                "range": _RANGE8, "error": 0.0}
+    if img.mode in ("I", "F") or img.mode.startswith("I;16"):
+        return _highbit(img)
+    # Image.histogram многоканального кадра — один проход по буферу, каналы подряд по 256
+    h = img.histogram() if img.mode in ("RGB", "RGBA", "RGBX") else img.convert("RGB").histogram()
+    return {"mode": "RGB", "L": None, "R": h[0:256], "G": h[256:512], "B": h[512:768],
+            "range": _RANGE8, "error": 0.0}
+
+
+def _known(img: Image.Image) -> Optional[HistogramData]:
+    known = _memo.get(id(img))
+    if known is None or known[0] != img.mode or known[1] != img.size:
+        return None
+    data = known[2]
+    if callable(data):
+        data = data()
+        _memo[id(img)] = (img.mode, img.size, data)
+    return data
+
+
+def histogram_data(img: Image.Image) -> HistogramData:
+    data = _known(img)
+    if data is None:
+        data = _compute(img)
+        attach_histogram(img, data)
+    return data
+
+
+def sampled_histogram(img: Image.Image, budget: int = SAMPLE_BUDGET) -> HistogramData:
+    """
+    Приближённая гистограмма по равномерной выборке не больше budget пикселей.
+    Столбцы пересчитаны на весь кадр; в "error" — граница ошибки (см. SAMPLE_CONFIDENCE).
+    Точная гистограмма, если она уже известна или кадр не больше budget.
+    """
+    data = _known(img)
+    w, h = img.size
+    if data is not None or w * h <= budget:
+        return data if data is not None else histogram_data(img)
+    step = math.sqrt(w * h / budget)
+    sample = img.resize((max(1, int(w / step)), max(1, int(h / step))), Image.NEAREST)
+    data = _compute(sample)
+    n = sample.size[0] * sample.size[1]
+    k = w * h / n
+    for ch in ("L", "R", "G", "B"):
+        if data[ch] is not None:
+            data[ch] = [round(c * k) for c in data[ch]]
+    data["error"] = math.sqrt(math.log(2.0 / (1.0 - SAMPLE_CONFIDENCE)) / (2.0 * n))
+    return data
@@ -0,0 +1,69 @@
+from __future__ import annotations
+import numpy as np
+import cv2
+
+# Медианный фильтр. Рамка — повтор крайних пикселей (как у PIL MedianFilter и cv2.medianBlur).
+#  • cv2.medianBlur — 8 бит, 1/3/4 канала, любое нечётное окно (для окон > 5 OpenCV
+#    сам использует гистограммный O(1)-алгоритм Перро), 16 бит/float — только окна 3 и 5;
+#  • иначе — гистограммный алгоритм со скользящим окном (Huang/Perreault) на NumPy:
+#    гистограммы столбцов обновляются построчно, стоимость на пиксель не зависит от окна.
+
+__all__ = ["median_filter"]
+
+
+def _cv2_supports(arr: np.ndarray, ksize: int) -> bool:
+    channels = 1 if arr.ndim == 2 else arr.shape[2]
+    if channels not in (1, 3, 4):
+        return False
+    if arr.dtype == np.uint8:
+        return True
+    return ksize in (3, 5) and arr.dtype in (np.uint16, np.float32)
+
+
+def _median_hist_u8(channel: np.ndarray, ksize: int) -> np.ndarray:
+    """Медиана 8-битного канала через гистограммы столбцов (Perreault & Hébert)."""
+    r = ksize // 2
+    h, w = channel.shape
+    padded = np.pad(channel, r, mode="edge")
+    pw = w + 2 * r
+    cols = np.arange(pw)
+    rank = (ksize * ksize) // 2 + 1      # номер медианы (с единицы)
+
+    colhist = np.zeros((pw, 256), dtype=np.int32)
+    # в каждой строке индексы столбцов уникальны, поэтому хватает обычного += по индексам
+    for y in range(ksize):
+        colhist[cols, padded[y]] += 1
+
+    out = np.empty((h, w), dtype=np.uint8)
+    csum = np.zeros((pw + 1, 256), dtype=np.int32)
+    for y in range(h):
+        if y > 0:
+            # окно сдвинулось на строку: убираем верхнюю, добавляем нижнюю
+            colhist[cols, padded[y - 1]] -= 1
+            colhist[cols, padded[y + ksize - 1]] += 1
+        # гистограммы всех окон строки разом: разность накопленных сумм по столбцам
+        np.cumsum(colhist, axis=0, out=csum[1:])
+        win = csum[ksize:] - csum[:w]
+        np.cumsum(win, axis=1, out=win)
+        out[y] = np.argmax(win >= rank, axis=1)
+    return out
+
+
+def median_filter(arr: np.ndarray, ksize: int) -> np.ndarray:
+    """Медианный фильтр HxW или HxWxC буфера, все каналы за один проход по кадру.
+    ksize — нечётный размер окна."""
+    ksize = int(ksize)
+    if ksize % 2 == 0:
+        ksize += 1
+    if ksize <= 1:
+        return arr.copy()
+    if _cv2_supports(arr, ksize):
+        return cv2.medianBlur(np.ascontiguousarray(arr), ksize)
+    if arr.dtype != np.uint8:
+        raise ValueError(f"Median {ksize}×{ksize} is not supported for {arr.dtype}")
+    if arr.ndim == 2:
+        return _median_hist_u8(arr, ksize)
+    out = np.empty_like(arr)
+    for c in range(arr.shape[2]):
+        out[:, :, c] = _median_hist_u8(arr[:, :, c], ksize)
+    return out
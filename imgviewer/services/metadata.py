@@ -1,6 +1,9 @@
 from __future__ import annotations
 import os
-from typing import Dict, List, Optional
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 from PIL import Image, ExifTags
 
 BITS_PER_PIXEL: Dict[str, int] = {
@@ -32,15 +35,16 @@ def exif_dict(img: Image.Image) -> Dict[str, object]:
     except Exception:
         return {}
 
+EXIF_KEYS = (
+    "DateTimeOriginal", "DateTime", "CreateDate",
+    "Make", "Model", "LensModel",
+    "ExposureTime", "FNumber", "ISOSpeedRatings", "PhotographicSensitivity",
+    "FocalLength", "Orientation", "Software",
+)
+
 def pick_exif_fields(ed: Dict[str, object]) -> List[str]:
-    keys = [
-        "DateTimeOriginal", "DateTime", "CreateDate",
-        "Make", "Model", "LensModel",
-        "ExposureTime", "FNumber", "ISOSpeedRatings", "PhotographicSensitivity",
-        "FocalLength", "Orientation", "Software",
-    ]
     out: List[str] = []
-    for k in keys:
+    for k in EXIF_KEYS:
         if k in ed:
             v = ed[k]
             if isinstance(v, bytes):
@@ -56,27 +60,91 @@ def pick_exif_fields(ed: Dict[str, object]) -> List[str]:
                 break
     return out
 
+# Сведения о файле (размер на диске, формат, DPI, кадры, EXIF, ICC) не меняются от правок
+# картинки: они считаются один раз на (путь, mtime, размер) и берутся из кэша, пока файл
+# не изменился. На каждый вызов describe заново считаются только поля, зависящие от пикселей
+# (разрешение, режим, каналы), и один os.stat.
+FILE_CACHE_SIZE = 64   # файлов в кэше сведений
+
+@dataclass(frozen=True)
+class FileFacts:
+    file_size: int
+    fmt: str
+    dpi: Optional[object]
+    n_frames: int
+    icc_len: int             # ICC из img.info (если профиль не передан явно)
+    exif_lines: Tuple[str, ...]
+
+_file_cache: "OrderedDict[Tuple[str, int, int], FileFacts]" = OrderedDict()
+_file_lock = threading.Lock()
+
+def image_dpi(img: Image.Image) -> Optional[object]:
+    """DPI из info ('dpi' или 'resolution'), если указано."""
+    if isinstance(img.info.get("dpi"), (tuple, list)) and img.info.get("dpi"):
+        return img.info.get("dpi")
+    if "resolution" in img.info:
+        return img.info.get("resolution")
+    return None
+
+def _read_facts(img: Image.Image, path: Optional[str], file_size: int) -> FileFacts:
+    fmt = img.format or (os.path.splitext(path)[1].upper().lstrip(".") if path else "N/A")
+    return FileFacts(
+        file_size=file_size,
+        fmt=fmt,
+        dpi=image_dpi(img),
+        n_frames=getattr(img, "n_frames", 1),
+        icc_len=len(img.info.get("icc_profile", b"") or b""),
+        exif_lines=tuple(pick_exif_fields(exif_dict(img)) or ["не обнаружен"]),
+    )
+
+def file_facts(img: Image.Image, path: Optional[str]) -> FileFacts:
+    """Сведения о файле path; кэш по (путь, mtime, размер).
+    При промахе заголовок читается из самого файла (Image.open без load()): img к этому
+    моменту может быть уже правкой или предпросмотром — без формата и EXIF. По img
+    сведения берутся только без файла на диске (и тогда не кэшируются)."""
+    try:
+        st = os.stat(path) if path else None
+    except OSError:
+        st = None
+    if st is None:
+        return _read_facts(img, path, 0)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _file_lock:
+        facts = _file_cache.get(key)
+        if facts is not None:
+            _file_cache.move_to_end(key)
+            return facts
+    try:
+        with Image.open(path) as src:
+            facts = _read_facts(src, path, st.st_size)
+    except Exception:   # файл подменили на нечитаемый — сведения по картинке, без кэша
+        return _read_facts(img, path, st.st_size)
+    with _file_lock:
+        _file_cache[key] = facts
+        while len(_file_cache) > FILE_CACHE_SIZE:
+            _file_cache.popitem(last=False)
+    return facts
+
+def clear_cache() -> None:
+    with _file_lock:
+        _file_cache.clear()
+
 def describe(img: Image.Image, *, path: Optional[str], icc_profile: Optional[bytes]) -> str:
-    file_size = os.path.getsize(path) if path and os.path.exists(path) else 0
+    facts = file_facts(img, path)
+    file_size = facts.file_size
     w, h = img.size
-    fmt = img.format or (os.path.splitext(path)[1].upper().lstrip(".") if path else "N/A") # формат изображения
+    fmt = facts.fmt                             # формат изображения
     mode = img.mode                             # режим изображения
     bpp = BITS_PER_PIXEL.get(mode)              # глубина цвета
     bands = ",".join(img.getbands())            # список каналов
 
-    dpi = None
-    if isinstance(img.info.get("dpi"), (tuple, list)) and img.info.get("dpi"):
-        dpi = img.info.get("dpi")
-    elif "resolution" in img.info:
-        dpi = img.info.get("resolution")
-
-    n_frames = getattr(img, "n_frames", 1)
+    dpi = facts.dpi
+    n_frames = facts.n_frames
     has_alpha = "A" in bands
-    icc_len = len(icc_profile) if icc_profile else len(img.info.get("icc_profile", b"")) or 0
+    icc_len = len(icc_profile) if icc_profile else facts.icc_len
     approx_mem = int(w * h * bpp // 8) if bpp else None
 
-    ed = exif_dict(img)
-    exif_lines = pick_exif_fields(ed) or ["не обнаружен"]
+    exif_lines = facts.exif_lines
 
     lines = []
     lines.append(f"Путь: {path}")
@@ -0,0 +1,116 @@
+from __future__ import annotations
+from typing import List, Optional, Tuple
+import numpy as np
+import cv2
+
+# Морфология для крупных структурных элементов.
+# Пресеты диалога (Квадрат, Крест, Ромб, Эллипс) и прямоугольные ядра — это объединения
+# прямоугольников с общим центром. Эрозия по объединению = минимум эрозий по частям,
+# дилатация — максимум. Прямоугольник OpenCV считает раздельно (строки, затем столбцы),
+# так что его стоимость почти не зависит от размера; крест — две линии; ромб радиуса R —
+# R проходов креста 3×3. Пиксели за краем кадра не участвуют — как у OpenCV, поэтому
+# результат совпадает с cv2.erode/dilate/morphologyEx по исходному ядру.
+
+# Начиная с какого размера ядра (max(kh, kw)) раскладывать; мелкие ядра OpenCV считает быстрее
+DECOMPOSE_MIN_SIZE = 31
+
+Rect = Tuple[int, int]  # (полувысота, полуширина)
+
+__all__ = ["DECOMPOSE_MIN_SIZE", "decompose_kernel", "morph_rects"]
+
+
+def decompose_kernel(kernel: np.ndarray) -> Optional[List[Rect]]:
+    """Представить 0/1 ядро нечётного размера как объединение центрированных прямоугольников.
+    None — если так нельзя (несимметричное, «дырявое» или чётного размера ядро)."""
+    k = np.asarray(kernel) > 0
+    kh, kw = k.shape
+    if kh % 2 == 0 or kw % 2 == 0:
+        return None
+    cy, cx = kh // 2, kw // 2
+    if not k[cy, cx]:
+        return None
+
+    # полуширина каждой строки; строка должна быть сплошным отрезком с центром в cx
+    half = []
+    for row in k:
+        xs = np.flatnonzero(row)
+        if xs.size == 0:
+            half.append(-1)
+            continue
+        hw = cx - int(xs[0])
+        if int(xs[-1]) != cx + hw or xs.size != 2 * hw + 1:
+            return None
+        half.append(hw)
+
+    # симметрия сверху/снизу и невозрастание полуширины от центра к краям
+    for d in range(1, cy + 1):
+        up, down = half[cy - d], half[cy + d]
+        if up != down or up > half[cy - d + 1]:
+            return None
+
+    rects: List[Rect] = []
+    for d in range(cy + 1):
+        hw = half[cy + d]
+        if hw < 0:
+            break
+        if d == cy or half[cy + d + 1] != hw:
+            rects.append((d, hw))   # самая высокая полоса данной ширины
+    return rects
+
+
+_CROSS3 = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+
+
+def _rect(hh: int, hw: int) -> np.ndarray:
+    return np.ones((2 * hh + 1, 2 * hw + 1), dtype=np.uint8)
+
+
+def _diamond_radius(rects: List[Rect]) -> Optional[int]:
+    """Ромб радиуса R = лестница (d, R-d): его даёт R-кратное применение креста 3×3."""
+    R = rects[0][1]
+    if R >= 2 and rects == [(d, R - d) for d in range(R + 1)]:
+        return R
+    return None
+
+
+def _by_rects(arr: np.ndarray, rects: List[Rect], fn, combine) -> np.ndarray:
+    diamond = _diamond_radius(rects)
+    if diamond is not None:
+        return fn(arr, _CROSS3, iterations=diamond)
+    out = None
+    for hh, hw in rects:
+        # прямоугольник OpenCV считает раздельно (строки, затем столбцы)
+        part = fn(arr, _rect(hh, hw))
+        out = part if out is None else combine(out, part)
+    return out
+
+
+def _repeat(arr: np.ndarray, rects: List[Rect], fn, combine, iterations: int) -> np.ndarray:
+    if len(rects) == 1:
+        hh, hw = rects[0]
+        return fn(arr, _rect(hh, hw), iterations=iterations)
+    for _ in range(iterations):
+        arr = _by_rects(arr, rects, fn, combine)
+    return arr
+
+
+def morph_rects(arr: np.ndarray, op: str, rects: List[Rect], iterations: int = 1) -> np.ndarray:
+    """Морфологическая операция по ядру из decompose_kernel; совпадает с cv2.erode/dilate/
+    morphologyEx (те же итерации и рамка). arr — HxW или HxWxC (до 4 каналов), uint8."""
+    erode = lambda a: _repeat(a, rects, cv2.erode, cv2.min, iterations)
+    dilate = lambda a: _repeat(a, rects, cv2.dilate, cv2.max, iterations)
+    if op == "erosion":
+        return erode(arr)
+    if op == "dilation":
+        return dilate(arr)
+    if op == "opening":
+        return dilate(erode(arr))
+    if op == "closing":
+        return erode(dilate(arr))
+    if op == "gradient":
+        return cv2.subtract(dilate(arr), erode(arr))
+    if op == "tophat":
+        return cv2.subtract(arr, dilate(erode(arr)))
+    if op == "blackhat":
+        return cv2.subtract(erode(dilate(arr)), arr)
+    raise ValueError(f"Unknown morph op: {op}")
@@ -0,0 +1,385 @@
+from __future__ import annotations
+import hashlib
+import math
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+import numpy as np
+import cv2
+from PIL import Image
+from imgviewer.services import transforms as Sx
+from imgviewer.services.histogram import (HistogramData, attach_histogram, histogram_data, histogram_from_lut,
+                                          patched_histogram)
+from imgviewer.services.tiling import kernel_halo
+
+# Предпросмотр на уменьшенной копии (proxy).
+# Холст показывает картинку в масштабе zoom, поэтому при zoom < 1 считать фильтр в полном
+# разрешении бессмысленно: копия строится один раз на сессию диалога в разрешении показа,
+# операции предпросмотра идут по ней, а полное разрешение считается только при «Применить».
+# Радиусы ядер уменьшаются в том же масштабе, чтобы картинка выглядела так же.
+# При увеличении холст показывает лишь часть кадра (region): тогда операция считается по
+# этой области с ореолом радиуса ядра — пиксели области совпадают с обработкой целого кадра
+# (как у тайлов в tiling.run_tiled). Результат — PatchedImage: нетронутая копия плюс кусок
+# размером с область; кадр целиком не копируется, кусок на экране накладывает сам холст.
+# Область выравнивается наружу по сетке REGION_GRID, чтобы мелкий сдвиг окна попадал в кэш.
+
+Region = Tuple[int, int, int, int]   # (x0, y0, x1, y1) в пикселях исходника
+
+# Если видимая область занимает большую часть кадра, проще посчитать кадр целиком
+REGION_MAX_FRACTION = 0.5
+# Шаг сетки, по которой выравнивается область (пиксели копии)
+REGION_GRID = 128
+# Размер копии, по которой оценивается средняя яркость кадра для контраста
+STATS_MAX_SIDE = 512
+# Бюджет кэша готовых предпросмотров, байты
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+__all__ = ["PreviewProxy", "PreviewCache", "PREVIEW_CACHE", "PatchedImage", "Region",
+           "REGION_MAX_FRACTION", "REGION_GRID", "CACHE_MAX_BYTES", "proxy_scale", "scale_size",
+           "apply_region", "image_nbytes", "kernel_digest"]
+
+
+def proxy_scale(zoom: float) -> float:
+    """Масштаб копии для показа с данным zoom (крупнее оригинала не делаем)."""
+    return max(0.01, min(1.0, float(zoom)))
+
+
+def scale_size(n: int, scale: float) -> int:
+    """Размер окна/ядра в масштабе копии: нечётный, не меньше 1."""
+    v = max(1, int(round(int(n) * scale)))
+    return v if v % 2 == 1 else v + 1
+
+
+def _scale_float_kernel(kernel: np.ndarray, scale: float) -> np.ndarray:
+    kh, kw = kernel.shape
+    nh, nw = scale_size(kh, scale), scale_size(kw, scale)
+    if kh <= 3 and kw <= 3 or (nh, nw) == (kh, kw):
+        return kernel          # 3×3 и меньше — уменьшать некуда
+    out = cv2.resize(kernel.astype(np.float32), (nw, nh), interpolation=cv2.INTER_AREA)
+    # INTER_AREA усредняет блоки: домножение на отношение площадей сохраняет сумму и
+    # L1-норму ядра, в том числе у ядер с нулевой суммой (выделение краёв)
+    out *= (kh * kw) / (nh * nw)
+    return out
+
+
+def _block_starts(n: int, m: int) -> np.ndarray:
+    """Начала m блоков, на которые делится отрезок длины n (симметрично относительно центра)."""
+    return np.floor(np.arange(m) * (n / m)).astype(np.intp)
+
+
+def _scale_binary_kernel(kernel: np.ndarray, scale: float) -> np.ndarray:
+    kh, kw = kernel.shape
+    nh, nw = scale_size(kh, scale), scale_size(kw, scale)
+    if (nh, nw) == (kh, kw):
+        return kernel
+    # клетка нового ядра включена, если в её блоке есть хоть одна единица: тонкие линии
+    # (крест, ромб) не пропадают, центральные строка и столбец остаются
+    k = (np.asarray(kernel) != 0).astype(np.uint8)
+    k = np.maximum.reduceat(k, _block_starts(kh, nh), axis=0)
+    return np.maximum.reduceat(k, _block_starts(kw, nw), axis=1)
+
+
+def image_nbytes(img: Image.Image) -> int:
+    """Примерный объём пиксельных данных изображения."""
+    w, h = img.size
+    per_band = 4 if img.mode in ("I", "F") else (2 if img.mode.startswith("I;16") else 1)
+    return w * h * len(img.getbands()) * per_band
+
+
+def kernel_digest(kernel) -> Optional[str]:
+    """Короткий отпечаток ядра для ключа кэша (форма + тип + значения)."""
+    if kernel is None:
+        return None
+    k = np.ascontiguousarray(kernel)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((k.shape, k.dtype.str)).encode())
+    h.update(k.tobytes())
+    return h.hexdigest()
+
+
+class PreviewCache:
+    """
+    LRU готовых предпросмотров с бюджетом в байтах.
+    Ключ — (id исходника, операция и все её параметры); записи исходника удаляются,
+    когда сам исходник собран сборщиком мусора. Потокобезопасен.
+    """
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Hashable, Tuple[Image.Image, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._watched: set = set()
+
+    def get(self, key: Hashable) -> Optional[Image.Image]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: Hashable, img: Image.Image) -> None:
+        size = image_nbytes(img)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return   # больше всего бюджета — не кэшируем
+            self._items[key] = (img, size)
+            self._bytes += size
+            self._evict()
+
+    def watch(self, source: Image.Image) -> int:
+        """Идентификатор исходника для ключей; записи исчезнут вместе с ним."""
+        sid = id(source)
+        with self._lock:
+            if sid not in self._watched:
+                self._watched.add(sid)
+                weakref.finalize(source, self.drop_source, sid)
+        return sid
+
+    def drop_source(self, sid: int) -> None:
+        with self._lock:
+            self._watched.discard(sid)
+            for key in [k for k in self._items if k[0] == sid]:
+                self._bytes -= self._items.pop(key)[1]
+
+    def set_budget(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._items),
+                    "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._items:
+            _, (_, size) = self._items.popitem(last=False)
+            self._bytes -= size
+
+
+# общий кэш всех диалогов: повторное открытие диалога тоже попадает в кэш
+PREVIEW_CACHE = PreviewCache()
+
+
+def _filter_halo(op: str, kernel, extra: dict) -> Tuple[int, int]:
+    if op in ("median", "motion"):
+        size = extra.get("median_size", 3) if op == "median" else extra.get("motion_len", 9)
+        r = (int(size) | 1) // 2
+        return r, r
+    if op == "custom" and kernel is not None:
+        return kernel_halo(np.shape(kernel))
+    return 1, 1   # sharpen / emboss — 3×3
+
+
+class PatchedImage(Image.Image):
+    """
+    Кадр base с вклеенным с точки offset куском patch (результат apply_region), без копии кадра.
+    Холст рисует base и накладывает patch сам, гистограмма выводится из гистограммы base
+    (histogram.patched_histogram). Пиксели целиком собираются лениво, при первом обращении
+    к ним (load(), как у Image.open): сохранение, «Применить» к предпросмотру и т.п.
+    """
+    def __init__(self, base: Image.Image, patch: Image.Image, offset: Tuple[int, int]):
+        super().__init__()
+        self._mode = base.mode
+        self._size = base.size
+        self.info = base.info
+        self.base = base
+        self.patch = patch
+        self.offset = offset = (int(offset[0]), int(offset[1]))
+        # без ссылки на self: запись живёт в histogram до сборки самого изображения
+        attach_histogram(self, lambda: patched_histogram(base, patch, offset))
+
+    @property
+    def box(self) -> Region:
+        """Где кадр отличается от base (пиксели кадра)."""
+        x0, y0 = self.offset
+        return x0, y0, x0 + self.patch.size[0], y0 + self.patch.size[1]
+
+    def load(self):
+        if self._im is None:
+            whole = self.base.copy()
+            whole.paste(self.patch, self.offset)
+            self.im = whole.im
+        return super().load()
+
+
+def apply_region(img: Image.Image, region: Optional[Region], halo: Tuple[int, int],
+                 fn: Callable[[Image.Image], Image.Image],
+                 base: Optional[Callable[[str], Image.Image]] = None) -> Image.Image:
+    """
+    Применить fn только к области region (с ореолом halo = (по y, по x)); результат —
+    PatchedImage поверх необработанного изображения. region=None — fn(img) целиком.
+    base(mode): img в режиме результата (для операций, меняющих режим, например L).
+    """
+    if region is None:
+        return fn(img)
+    w, h = img.size
+    x0, y0, x1, y1 = region
+    hy, hx = halo
+    a0, b0 = max(0, x0 - hx), max(0, y0 - hy)
+    a1, b1 = min(w, x1 + hx), min(h, y1 + hy)
+    res = fn(img.crop((a0, b0, a1, b1)))
+    inner = res.crop((x0 - a0, y0 - b0, x1 - a0, y1 - b0))
+    if base is not None:
+        under = base(res.mode)
+    else:
+        under = img if img.mode == res.mode else img.convert(res.mode)
+    return PatchedImage(under, inner, (x0, y0))
+
+
+class PreviewProxy:
+    """Уменьшенная копия исходника для живого предпросмотра (строится один раз на сессию диалога)."""
+    def __init__(self, source: Image.Image, scale: float = 1.0, cache: Optional[PreviewCache] = None):
+        self.source = source
+        self.scale = proxy_scale(scale)
+        self.cache = PREVIEW_CACHE if cache is None else cache
+        self._sid = self.cache.watch(source)
+        self._image: Optional[Image.Image] = None
+        self._bases: Dict[str, Image.Image] = {}   # копия в других режимах (для вклейки области)
+        self._stats_image: Optional[Image.Image] = None
+        self._contrast_mean: Optional[Tuple[float, float, int]] = None
+
+    def rescaled(self, scale: float) -> "PreviewProxy":
+        """Копия в другом масштабе (холст сменил zoom при открытом диалоге); тот же масштаб — self."""
+        if proxy_scale(scale) == self.scale:
+            return self
+        return PreviewProxy(self.source, scale, cache=self.cache)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Размер копии (сама копия для этого не строится)."""
+        if self.scale >= 1.0:
+            return self.source.size
+        w, h = self.source.size
+        return max(1, round(w * self.scale)), max(1, round(h * self.scale))
+
+    @property
+    def image(self) -> Image.Image:
+        if self._image is None:
+            if self.scale >= 1.0:
+                self._image = self.source
+            else:
+                self._image = self.source.resize(self.size, Image.BILINEAR, reducing_gap=2.0)
+        return self._image
+
+    def _base(self, mode: str) -> Image.Image:
+        img = self.image
+        if img.mode == mode:
+            return img
+        if mode not in self._bases:
+            self._bases[mode] = img.convert(mode)
+        return self._bases[mode]
+
+    def region_box(self, region: Optional[Region]) -> Optional[Region]:
+        """Область исходника -> область копии, которую посчитают операции; None — кадр целиком
+        (region=None или выгоднее считать всё)."""
+        if region is None:
+            return None
+        w, h = self.size
+        sx, sy = w / self.source.size[0], h / self.source.size[1]
+        g = REGION_GRID
+        x0, y0 = max(0, int(region[0] * sx) // g * g), max(0, int(region[1] * sy) // g * g)
+        x1 = min(w, -(-math.ceil(region[2] * sx) // g) * g)
+        y1 = min(h, -(-math.ceil(region[3] * sy) // g) * g)
+        if x1 <= x0 or y1 <= y0 or (x1 - x0) * (y1 - y0) > REGION_MAX_FRACTION * w * h:
+            return None
+        return x0, y0, x1, y1
+
+    def _cached(self, key: tuple, compute: Callable[[], Image.Image]) -> Image.Image:
+        key = (self._sid, self.scale) + key
+        out = self.cache.get(key)
+        if out is None:
+            out = compute()
+            self.cache.put(key, out)
+        return out
+
+    def _apply(self, key: tuple, region, halo, fn) -> Image.Image:
+        box = self.region_box(region)
+        if box is None:
+            return self._cached(key, lambda: fn(self.image))
+        # в кэше — только кусок области; основа и так живёт в копии
+        patch = self._cached(key + (box,),
+                             lambda: apply_region(self.image, box, halo, fn, base=self._base).patch)
+        return PatchedImage(self._base(patch.mode), patch, box[:2])
+
+    # ---- операции в масштабе копии ----
+    def filter(self, op: str, kernel, mode: str, normalize: bool, extra: dict | None = None,
+               region: Optional[Region] = None) -> Image.Image:
+        extra = dict(extra or {})
+        if self.scale < 1.0:
+            if "median_size" in extra:
+                extra["median_size"] = scale_size(extra["median_size"], self.scale)
+            if "motion_len" in extra:
+                extra["motion_len"] = scale_size(extra["motion_len"], self.scale)
+            if kernel is not None and op == "custom":
+                kernel = _scale_float_kernel(np.asarray(kernel, dtype=np.float32), self.scale)
+        key = ("filter", op, kernel_digest(kernel), mode, bool(normalize), tuple(sorted(extra.items())))
+        return self._apply(key, region, _filter_halo(op, kernel, extra),
+                           lambda im: Sx.filter_apply(im, op, kernel, mode, normalize, extra))
+
+    def morph(self, op: str, kernel, iterations: int, mode: str,
+              region: Optional[Region] = None) -> Image.Image:
+        if self.scale < 1.0:
+            kernel = _scale_binary_kernel(np.asarray(kernel, dtype=np.uint8), self.scale)
+        halo = Sx.morph_halo(op, np.shape(kernel), iterations)
+        key = ("morph", op, kernel_digest(np.asarray(kernel, dtype=np.uint8)), int(iterations), mode)
+        return self._apply(key, region, halo, lambda im: Sx.morph_apply(im, op, kernel, iterations, mode))
+
+    def _mean_after(self, brightness: float, saturation: float) -> int:
+        """Средняя яркость кадра после яркости/насыщенности — опора контраста (как в ImageEnhance.Contrast).
+        Считается по уменьшенной копии: кадр целиком ради одного числа не обрабатываем."""
+        key = (brightness, saturation)
+        if self._contrast_mean is None or self._contrast_mean[:2] != key:
+            if self._stats_image is None:
+                img = self.image
+                factor = max(1, math.ceil(max(img.size) / STATS_MAX_SIDE))
+                self._stats_image = img.reduce(factor) if factor > 1 else img
+            mean = Sx.contrast_mean(self._stats_image, brightness, saturation)
+            self._contrast_mean = (brightness, saturation, mean)
+        return self._contrast_mean[2]
+
+    def bsc(self, brightness: float, saturation: float, contrast: float,
+            region: Optional[Region] = None) -> Image.Image:
+        key = ("bsc", float(brightness), float(saturation), float(contrast))
+        if self.region_box(region) is None:
+            return self._apply(key, None, (0, 0),
+                               lambda im: Sx.adjust_bsc(im, brightness, saturation, contrast))
+        # контраст зависит от средней яркости всего кадра, а не области
+        mean = self._mean_after(brightness, saturation)
+        return self._apply(key, region, (0, 0),
+                           lambda im: Sx.adjust_bsc(im, brightness, saturation, contrast, mean=mean))
+
+    def levels(self, black: int, white: int, gamma: float,
+               region: Optional[Region] = None) -> Image.Image:
+        key = ("levels", int(black), int(white), float(gamma))
+        return self._apply(key, region, (0, 0), lambda im: Sx.bw_levels(im, black, white, gamma))
+
+    def levels_histogram(self, black: int, white: int, gamma: float,
+                         region: Optional[Region] = None) -> HistogramData:
+        """Гистограмма того, что вернёт levels() с теми же аргументами, без прохода по результату:
+        по гистограмме копии в L — в области значения идут через таблицу уровней, вне её не меняются."""
+        lut = Sx.levels_lut(black, white, gamma)
+        base = self._base("L")
+        box = self.region_box(region)
+        if box is None:
+            return histogram_from_lut(histogram_data(base), lut)
+        inside = histogram_data(base.crop(box))
+        mapped = histogram_from_lut(inside, lut)["L"]
+        whole = histogram_data(base)["L"]
+        counts = [t - i + m for t, i, m in zip(whole, inside["L"], mapped)]
+        return {"mode": "L", "L": counts, "R": None, "G": None, "B": None,
+                "range": (0.0, 255.0), "error": 0.0}
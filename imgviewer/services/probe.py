@@ -0,0 +1,119 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from PIL import Image
+
+from imgviewer.services.metadata import EXIF_KEYS, exif_dict, image_dpi
+
+# Быстрый обзор файлов без декодирования пикселей.
+# Image.open читает только заголовок (пиксели грузятся лениво при load()), поэтому формат,
+# размеры, режим, DPI, EXIF и ICC достаются за доли миллисекунды на файл. Файлы читаются
+# в пуле потоков — время уходит в основном на ввод-вывод, а он отпускает GIL.
+# Для анимаций n_frames у некоторых форматов (GIF) пролистывает файл, но не декодирует кадры.
+
+WORKERS = 8   # потоков по умолчанию
+
+__all__ = ["ProbeRecord", "WORKERS", "is_image_path", "iter_image_paths", "probe", "probe_many", "main"]
+
+
+@dataclass
+class ProbeRecord:
+    path: str
+    file_size: Optional[int] = None
+    format: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    mode: Optional[str] = None
+    n_frames: Optional[int] = None
+    dpi: Optional[Tuple[float, float]] = None
+    icc_len: int = 0
+    exif: Dict[str, str] = field(default_factory=dict)   # только поля из metadata.EXIF_KEYS
+    error: Optional[str] = None
+
+
+def is_image_path(path: str) -> bool:
+    """Расширение, которое PIL умеет открывать."""
+    return os.path.splitext(path)[1].lower() in Image.registered_extensions()
+
+
+def iter_image_paths(paths: Iterable[str], recursive: bool = True) -> Iterator[str]:
+    """Файлы как есть, каталоги — раскрываются в файлы изображений (по расширению)."""
+    for p in paths:
+        if not os.path.isdir(p):
+            yield p
+            continue
+        if recursive:
+            for root, dirs, files in os.walk(p):
+                dirs.sort()
+                for name in sorted(files):
+                    if is_image_path(name):
+                        yield os.path.join(root, name)
+        else:
+            with os.scandir(p) as it:
+                for entry in sorted(it, key=lambda e: e.name):
+                    if entry.is_file() and is_image_path(entry.name):
+                        yield entry.path
+
+
+def _text(v: object) -> str:
+    if isinstance(v, bytes):
+        return v.decode(errors="ignore").rstrip("\x00")
+    return str(v)
+
+
+def probe(path: str) -> ProbeRecord:
+    """Сведения о файле по заголовку; ошибка чтения — в поле error, а не исключением."""
+    rec = ProbeRecord(path=path)
+    try:
+        rec.file_size = os.path.getsize(path)
+        with Image.open(path) as img:
+            rec.format = img.format
+            rec.width, rec.height = img.size
+            rec.mode = img.mode
+            rec.n_frames = getattr(img, "n_frames", 1)
+            dpi = image_dpi(img)
+            if isinstance(dpi, (tuple, list)) and len(dpi) >= 2:
+                rec.dpi = (float(dpi[0]), float(dpi[1]))
+            elif dpi is not None:
+                rec.dpi = (float(dpi), float(dpi))
+            rec.icc_len = len(img.info.get("icc_profile", b"") or b"")
+            ed = exif_dict(img)
+            rec.exif = {k: _text(ed[k]) for k in EXIF_KEYS if k in ed}
+    except Exception as e:   # битый/неподдерживаемый файл — фиксируем и идём дальше
+        rec.error = f"{type(e).__name__}: {e}"
+    return rec
+
+
+def probe_many(paths: Iterable[str], workers: Optional[int] = None) -> Iterator[ProbeRecord]:
+    """probe для каждого пути в пуле потоков; порядок результатов — как у paths."""
+    n = max(1, int(workers if workers is not None else WORKERS))
+    with ThreadPoolExecutor(max_workers=n) as ex:
+        yield from ex.map(probe, paths)
+
+
+def _parse_args(argv):
+    p = argparse.ArgumentParser(prog="python -m imgviewer.services.probe",
+                                description="Сведения о файлах изображений без декодирования, JSON lines.")
+    p.add_argument("paths", nargs="+", help="файлы и/или каталоги")
+    p.add_argument("--workers", type=int, default=WORKERS, help="потоков (по умолчанию: %(default)s)")
+    p.add_argument("--no-recursive", action="store_true", help="не заходить в подкаталоги")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    failed = 0
+    out = sys.stdout
+    for rec in probe_many(iter_image_paths(args.paths, recursive=not args.no_recursive), args.workers):
+        failed += rec.error is not None
+        out.write(json.dumps(asdict(rec), ensure_ascii=False) + "\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
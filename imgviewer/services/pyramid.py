@@ -0,0 +1,72 @@
+from __future__ import annotations
+import math
+from typing import List, Optional, Tuple
+from PIL import Image
+
+# Пирамида уменьшений для показа с зумом.
+# Уровень i — исходник, уменьшенный в 2^i раз (Image.reduce(2) от предыдущего уровня:
+# усреднение 2×2, без алиасинга). Уровни строятся лениво и живут вместе с пирамидой.
+# Для показа с масштабом z берётся ближайший уровень не меньше нужного размера, и
+# LANCZOS работает от него: уменьшение каждый раз меньше чем вдвое, качество то же,
+# а объём чтения падает вчетверо на каждый уровень.
+
+MIN_LEVEL_SIDE = 32   # меньше этого уровни не строим
+
+Box = Tuple[float, float, float, float]   # (x0, y0, x1, y1) в пикселях исходника
+
+__all__ = ["MIN_LEVEL_SIDE", "ImagePyramid"]
+
+
+def _reducible(img: Image.Image) -> Image.Image:
+    """Image.reduce не умеет '1', 'P' и 16-битные режимы — приводим к ближайшему умеющему."""
+    if img.mode == "1":
+        return img.convert("L")
+    if img.mode == "P":
+        return img.convert("RGBA" if "transparency" in img.info else "RGB")
+    if img.mode.startswith("I;16"):
+        return img.convert("I")
+    return img
+
+
+class ImagePyramid:
+    """Ленивая пирамида 2× уменьшений одного изображения."""
+    def __init__(self, image: Image.Image):
+        self.image = image
+        self._levels: List[Image.Image] = [image]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.image.size
+
+    def level(self, i: int) -> Image.Image:
+        """Уровень i (0 — исходник); если такой слишком мал, возвращается последний."""
+        while len(self._levels) <= i:
+            prev = self._levels[-1]
+            if min(prev.size) // 2 < MIN_LEVEL_SIDE:
+                break
+            self._levels.append(_reducible(prev).reduce(2))
+        return self._levels[min(i, len(self._levels) - 1)]
+
+    def level_for(self, scale: float) -> Image.Image:
+        """Самый мелкий уровень, который при масштабе scale ещё не придётся увеличивать."""
+        if scale >= 1.0:
+            return self.image
+        return self.level(int(math.floor(math.log2(1.0 / scale))))
+
+    def resize(self, size: Tuple[int, int], resample=Image.LANCZOS,
+               box: Optional[Box] = None) -> Image.Image:
+        """
+        Как image.resize(size, resample, box=box), но от подходящего уровня пирамиды.
+        box — область исходника (по умолчанию весь кадр).
+        """
+        w0, h0 = self.image.size
+        if box is None:
+            box = (0.0, 0.0, float(w0), float(h0))
+        bw, bh = box[2] - box[0], box[3] - box[1]
+        scale = min(size[0] / bw if bw > 0 else 1.0, size[1] / bh if bh > 0 else 1.0)
+        lvl = self.level_for(scale)
+        if lvl is self.image:
+            return self.image.resize(size, resample, box=box)
+        sx, sy = lvl.size[0] / w0, lvl.size[1] / h0
+        lbox = (box[0] * sx, box[1] * sy, box[2] * sx, box[3] * sy)
+        return lvl.resize(size, resample, box=lbox)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import weakref
+from typing import Dict, List, Sequence, Tuple, TypedDict
+import numpy as np
+import cv2
+from PIL import Image
+
+from imgviewer.services.histogram import HistogramData, histogram_data, invalidate_histogram, sampled_histogram
+
+# Статистика по каналам (среднее, СКО, минимум, максимум, медиана, перцентили).
+# Для 8-битных кадров всё выводится из гистограммы за O(256) — кадр не сканируется, а сама
+# гистограмма берётся из общего кэша histogram_data. У I;16 / I / F гистограмма сведена к 256
+# столбцам и точной статистики не даёт: там один проход по кадру — подробная гистограмма
+# по всем уровням (I;16 и узкие I) либо NumPy по значениям (F и широкие I).
+# Перцентили — по обратной функции распределения (наименьшее значение, у которого
+# накопленная доля ≥ p), как numpy.percentile(..., method="inverted_cdf").
+
+DEFAULT_PERCENTILES: Tuple[float, ...] = (1.0, 5.0, 25.0, 75.0, 95.0, 99.0)
+
+
+class ChannelStats(TypedDict):
+    count: int
+    mean: float
+    std: float
+    min: float
+    max: float
+    median: float
+    percentiles: Dict[float, float]
+
+
+__all__ = ["ChannelStats", "DEFAULT_PERCENTILES", "image_stats", "invalidate_stats",
+           "stats_from_counts", "stats_lines"]
+
+# Статистика high-bit кадров: id -> (режим, размер, перцентили, результат), как в histogram
+_memo: Dict[int, Tuple[str, Tuple[int, int], Tuple[float, ...], Dict[str, ChannelStats]]] = {}
+
+
+def stats_from_counts(counts: Sequence[float], values: Sequence[float],
+                      percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> ChannelStats:
+    """Статистика по гистограмме: counts[i] пикселей со значением values[i] (values по возрастанию)."""
+    c = np.asarray(counts, dtype=np.float64)
+    v = np.asarray(values, dtype=np.float64)
+    n = c.sum()
+    if n <= 0:
+        nan = float("nan")
+        return {"count": 0, "mean": nan, "std": nan, "min": nan, "max": nan, "median": nan,
+                "percentiles": {float(p): nan for p in percentiles}}
+    used = np.flatnonzero(c)
+    mean = float((c * v).sum() / n)
+    var = float((c * (v - mean) ** 2).sum() / n)
+    cdf = np.cumsum(c)
+    qs = [50.0] + [float(p) for p in percentiles]
+    ranks = np.clip(np.ceil(np.asarray(qs) / 100.0 * n), 1, n)
+    at = v[np.searchsorted(cdf, ranks)].tolist()
+    return {
+        "count": int(n),
+        "mean": mean,
+        "std": var ** 0.5,
+        "min": float(v[used[0]]),
+        "max": float(v[used[-1]]),
+        "median": at[0],
+        "percentiles": dict(zip(qs[1:], at[1:])),
+    }
+
+
+def _from_histogram(data: HistogramData, percentiles: Sequence[float]) -> Dict[str, ChannelStats]:
+    lo, hi = data["range"]
+    if (lo, hi) == (0.0, 255.0):
+        values = np.arange(256, dtype=np.float64)
+    else:   # сведённая гистограмма (только для приближённой статистики) — середины столбцов
+        values = lo + (np.arange(256) + 0.5) * (hi - lo) / 256.0
+    chans = ("L",) if data["mode"] == "L" else ("R", "G", "B")
+    return {ch: stats_from_counts(data[ch], values, percentiles) for ch in chans}
+
+
+def _values_stats(a: np.ndarray, percentiles: Sequence[float]) -> ChannelStats:
+    """F и широкие I: статистика прямо по значениям (NaN и бесконечности пропускаются)."""
+    a = a.ravel()
+    if a.dtype.kind == "f":
+        a = a[np.isfinite(a)]
+    if a.size == 0:
+        return stats_from_counts([], [], percentiles)
+    qs = [50.0] + [float(p) for p in percentiles]
+    at = np.percentile(a, qs, method="inverted_cdf").tolist()
+    mean, std = cv2.meanStdDev(a.astype(np.float64).reshape(-1, 1))
+    return {
+        "count": int(a.size),
+        "mean": float(mean[0, 0]),
+        "std": float(std[0, 0]),
+        "min": float(a.min()),
+        "max": float(a.max()),
+        "median": at[0],
+        "percentiles": dict(zip(qs[1:], at[1:])),
+    }
+
+
+def _highbit(img: Image.Image, percentiles: Sequence[float]) -> ChannelStats:
+    a = np.asarray(img)
+    if a.dtype.kind in "iu" and a.dtype.itemsize <= 2:
+        a = a.astype(np.uint16, copy=False)
+        fine = cv2.calcHist([a.reshape(-1, 1)], [0], None, [65536], [0, 65536]).ravel()
+        return stats_from_counts(fine, np.arange(65536), percentiles)
+    if a.dtype.kind in "iu":
+        lo, hi = (int(v) for v in cv2.minMaxLoc(a)[:2])
+        if hi - lo <= 0xFFFF:
+            fine = cv2.calcHist([(a - lo).astype(np.uint16).reshape(-1, 1)], [0], None,
+                                [hi - lo + 1], [0, hi - lo + 1]).ravel()
+            return stats_from_counts(fine, np.arange(lo, hi + 1), percentiles)
+    return _values_stats(a, percentiles)
+
+
+def image_stats(img: Image.Image, percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                approx: bool = False) -> Dict[str, ChannelStats]:
+    """
+    Статистика по каналам: {"L": ...} или {"R": ..., "G": ..., "B": ...} — как у histogram_data.
+    approx=True — по выборочной гистограмме (sampled_histogram), для живого предпросмотра.
+    """
+    pct = tuple(float(p) for p in percentiles)
+    if approx:
+        return _from_histogram(sampled_histogram(img), pct)
+    if not (img.mode in ("I", "F") or img.mode.startswith("I;16")):
+        return _from_histogram(histogram_data(img), pct)
+    known = _memo.get(id(img))
+    if known is not None and known[:3] == (img.mode, img.size, pct):
+        return known[3]
+    res = {"L": _highbit(img, pct)}
+    key = id(img)
+    if key not in _memo:
+        weakref.finalize(img, _memo.pop, key, None)
+    _memo[key] = (img.mode, img.size, pct, res)
+    return res
+
+
+def invalidate_stats(img: Image.Image) -> None:
+    """Забыть статистику и гистограмму изображения (после изменения его пикселей на месте)."""
+    _memo.pop(id(img), None)
+    invalidate_histogram(img)
+
+
+def _num(x: float) -> str:
+    return f"{x:.4g}" if isinstance(x, float) and not x.is_integer() else f"{x:g}"
+
+
+def stats_lines(stats: Dict[str, ChannelStats]) -> List[str]:
+    """Строки для InfoPanel."""
+    lines: List[str] = []
+    for ch, s in stats.items():
+        lines.append(f"  {ch}: среднее {_num(s['mean'])}, СКО {_num(s['std'])}, "
+                     f"мин {_num(s['min'])}, макс {_num(s['max'])}, медиана {_num(s['median'])}")
+        if s["percentiles"]:
+            pcts = ", ".join(f"{p:g}% {_num(v)}" for p, v in s["percentiles"].items())
+            lines.append(f"     перцентили: {pcts}")
+    return lines
@@ -0,0 +1,78 @@
+from __future__ import annotations
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, Union
+import numpy as np
+
+# Планировщик тайлов: кадр режется на тайлы с «ореолом» (halo) вокруг,
+# тайлы считаются в пуле потоков (OpenCV/NumPy отпускают GIL), из результата
+# каждого тайла берётся только внутренняя часть. Для операций, где пиксель
+# зависит лишь от окрестности радиуса halo, результат совпадает с обработкой
+# целого кадра бит в бит: у внешних краёв тайл упирается в край картинки,
+# и рамка обрабатывается так же.
+
+TILE_SIZE = 1024             # сторона тайла (без ореола), пиксели
+WORKERS: Optional[int] = None  # None — по числу ядер
+
+Halo = Union[int, Tuple[int, int]]
+
+__all__ = ["TILE_SIZE", "WORKERS", "kernel_halo", "run_tiled"]
+
+
+def kernel_halo(shape: Tuple[int, int], reach: int = 1) -> Tuple[int, int]:
+    """Ореол для ядра kh×kw, применённого reach раз подряд (итерации, составные операции)."""
+    kh, kw = int(shape[0]), int(shape[1])
+    reach = max(1, int(reach))
+    return (kh // 2) * reach, (kw // 2) * reach
+
+
+def _workers(workers: Optional[int]) -> int:
+    n = workers if workers is not None else WORKERS
+    if n is None:
+        n = os.cpu_count() or 1
+    return max(1, int(n))
+
+
+def run_tiled(src: np.ndarray,
+              fn: Callable[[np.ndarray], np.ndarray],
+              halo: Halo,
+              *,
+              out: Optional[np.ndarray] = None,
+              tile: Optional[int] = None,
+              workers: Optional[int] = None) -> np.ndarray:
+    """
+    Применить fn к src по тайлам.
+    fn: принимает HxW[xC] кусок (с ореолом) и возвращает массив того же размера.
+    halo: радиус влияния операции — int или (по y, по x).
+    out: куда писать (по умолчанию новый массив формы и типа src; может быть видом).
+    tile, workers: переопределяют TILE_SIZE / WORKERS.
+    """
+    hy, hx = (halo, halo) if isinstance(halo, int) else halo
+    tile = max(1, int(tile or TILE_SIZE))
+    n_workers = _workers(workers)
+    h, w = src.shape[:2]
+    if out is None:
+        out = np.empty(src.shape, dtype=src.dtype)
+
+    boxes = [(y0, min(h, y0 + tile), x0, min(w, x0 + tile))
+             for y0 in range(0, h, tile) for x0 in range(0, w, tile)]
+
+    if len(boxes) == 1:
+        out[...] = fn(src)
+        return out
+
+    def work(box):
+        y0, y1, x0, x1 = box
+        a0, a1 = max(0, y0 - hy), min(h, y1 + hy)
+        b0, b1 = max(0, x0 - hx), min(w, x1 + hx)
+        res = fn(src[a0:a1, b0:b1])
+        out[y0:y1, x0:x1] = res[y0 - a0:y1 - a0, x0 - b0:x1 - b0]
+
+    if n_workers == 1:
+        for box in boxes:
+            work(box)
+        return out
+    with ThreadPoolExecutor(max_workers=min(n_workers, len(boxes))) as pool:
+        # list() — чтобы исключения из потоков всплыли здесь
+        list(pool.map(work, boxes))
+    return out
@@ -3,19 +3,136 @@ from PIL import Image, ImageEnhance, ImageFilter
 import numpy as np
 import cv2
 from math import cos, sin, radians
+from imgviewer.services.convolution import convolve_u8, plan_convolution
+from imgviewer.services.median import median_filter
+from imgviewer.services.morphology import DECOMPOSE_MIN_SIZE, decompose_kernel, morph_rects
+from imgviewer.services.tiling import kernel_halo, run_tiled
 
 def to_grayscale(img: Image.Image) -> Image.Image:
     """Градации серого"""
     return img.convert("L")
 
-def adjust_bsc(img: Image.Image, brightness: float, saturation: float, contrast: float) -> Image.Image:
-    """Яркость/насыщенность/контраст"""
-    out = ImageEnhance.Brightness(img).enhance(brightness)
-    out = ImageEnhance.Color(out).enhance(saturation)
-    out = ImageEnhance.Contrast(out).enhance(contrast)
+# Яркость/насыщенность/контраст — то же, что ImageEnhance.Brightness → Color → Contrast,
+# бит в бит, но без промежуточных кадров: выход выделяется один раз. Каждый шаг
+# ImageEnhance — Image.blend(degenerate, img, k) (float32 «a + k·(b − a)», отсечение,
+# отбрасывание дроби). Яркость (смешивание с чёрным) и контраст (с серым средней яркости)
+# поканальны и сводятся к таблицам на 256 значений; без насыщенности обе складываются
+# в одну таблицу и кадр проходит через img.point один раз. Насыщенность смешивает с серой
+# копией — это делается полосами строк прямо в выходной кадр, все промежуточные буферы
+# размером с полосу (Image.blend в C быстрее поэлементной таблицы в NumPy).
+# Опора контраста — средняя L после яркости и насыщенности: у L-кадров выводится из
+# гистограммы, у цветных копится по полосам (если mean не передан).
+_BSC_MODES = ("L", "RGB", "RGBA")
+_BSC_STRIP_PIXELS = 1 << 18   # пикселей в полосе
+
+def _blend_lut(base: float, factor: float) -> list[int]:
+    """Таблица v -> Image.blend(base, v, factor) для 8-битного канала."""
+    v = np.arange(256, dtype=np.float32)
+    b = np.float32(base)
+    return np.clip(b + np.float32(factor) * (v - b), 0, 255).astype(np.uint8).tolist()
+
+def _point_table(img: Image.Image, lut: list[int]) -> list[int]:
+    """Одна таблица на цветовые каналы; альфа — без изменений."""
+    if img.mode == "L":
+        return lut
+    return lut * 3 + (list(range(256)) if img.mode == "RGBA" else [])
+
+def _hist_mean(hist: list[int], n: int) -> int:
+    """Опора ImageEnhance.Contrast по гистограмме L: int(средняя яркость + 0.5)."""
+    return int(sum(i * c for i, c in enumerate(hist)) / n + 0.5) if n else 0
+
+def _mean_L(img: Image.Image) -> int:
+    """Опора ImageEnhance.Contrast: int(средняя яркость L + 0.5)."""
+    hist = (img if img.mode == "L" else img.convert("L")).histogram()
+    return _hist_mean(hist, img.size[0] * img.size[1])
+
+def _strips(size: tuple[int, int]):
+    """Полосы строк кадра: (x0, y0, x1, y1)."""
+    w, h = size
+    step = max(1, _BSC_STRIP_PIXELS // max(1, w))
+    for y0 in range(0, h, step):
+        yield 0, y0, w, min(h, y0 + step)
+
+def _brightness_saturation(img: Image.Image, lut_b: list[int] | None, saturation: float) -> Image.Image:
+    out = img
+    if lut_b is not None:
+        out = out.point(_point_table(out, lut_b))
+    if saturation != 1.0 and out.mode != "L":
+        degenerate = out.convert("L").convert(out.mode)
+        if out.mode == "RGBA":
+            degenerate.putalpha(out.getchannel("A"))
+        out = Image.blend(degenerate, out, saturation)
     return out
 
-def _build_levels_lut(black: int, white: int, gamma: float) -> list[int]:
+def _bs_mean(img: Image.Image, lut_b: list[int] | None, saturation: float) -> int:
+    """Средняя L после яркости и насыщенности, по полосам (без кадра целиком)."""
+    n = img.size[0] * img.size[1]
+    if img.mode == "L":
+        hist = img.histogram()
+        if lut_b is None:
+            return _hist_mean(hist, n)
+        return int(sum(v * c for v, c in zip(lut_b, hist)) / n + 0.5) if n else 0
+    hist = [0] * 256
+    for box in _strips(img.size):
+        part = _brightness_saturation(img.crop(box), lut_b, saturation).convert("L").histogram()
+        hist = [a + b for a, b in zip(hist, part)]
+    return _hist_mean(hist, n)
+
+def contrast_mean(img: Image.Image, brightness: float = 1.0, saturation: float = 1.0) -> int:
+    """Опора контраста для adjust_bsc (средняя яркость после яркости и насыщенности)."""
+    if img.mode not in _BSC_MODES:
+        img = ImageEnhance.Color(ImageEnhance.Brightness(img).enhance(brightness)).enhance(saturation)
+        return _mean_L(img)
+    lut_b = _blend_lut(0.0, brightness) if brightness != 1.0 else None
+    return _bs_mean(img, lut_b, saturation)
+
+def adjust_bsc(img: Image.Image, brightness: float, saturation: float, contrast: float,
+               *, mean: int | None = None) -> Image.Image:
+    """Яркость/насыщенность/контраст.
+    mean — опора контраста, если известна заранее (например, при обработке части кадра)."""
+    if img.mode not in _BSC_MODES:
+        out = ImageEnhance.Brightness(img).enhance(brightness)
+        out = ImageEnhance.Color(out).enhance(saturation)
+        if mean is None:
+            return ImageEnhance.Contrast(out).enhance(contrast)
+        degenerate = Image.new("L", out.size, mean).convert(out.mode)
+        if "A" in out.getbands():
+            degenerate.putalpha(out.getchannel("A"))
+        return Image.blend(degenerate, out, contrast)
+
+    lut_b = _blend_lut(0.0, brightness) if brightness != 1.0 else None
+    if img.mode == "L" or saturation == 1.0:
+        # всё поканально: яркость и контраст — одна таблица, один img.point
+        lut = lut_b if lut_b is not None else list(range(256))
+        if contrast != 1.0:
+            if mean is None:
+                mean = _bs_mean(img, lut_b, 1.0)
+            lut_c = _blend_lut(float(mean), contrast)
+            lut = [lut_c[v] for v in lut]
+        elif lut_b is None:
+            return img.copy()
+        return img.point(_point_table(img, lut))
+
+    # насыщенность: полосами прямо в выходной кадр
+    lut_c = _blend_lut(float(mean), contrast) if contrast != 1.0 and mean is not None else None
+    hist = [0] * 256 if contrast != 1.0 and mean is None else None
+    out = Image.new(img.mode, img.size)
+    for box in _strips(img.size):
+        part = _brightness_saturation(img.crop(box), lut_b, saturation)
+        if lut_c is not None:
+            part = part.point(_point_table(part, lut_c))
+        elif hist is not None:
+            hist = [a + b for a, b in zip(hist, part.convert("L").histogram())]
+        out.paste(part, box[:2])
+    if hist is not None:
+        # опора стала известна только после прохода — контраст по полосам того же кадра
+        table = _point_table(out, _blend_lut(float(_hist_mean(hist, img.size[0] * img.size[1])), contrast))
+        for box in _strips(img.size):
+            out.paste(out.crop(box).point(table), box[:2])
+    return out
+
+def levels_lut(black: int, white: int, gamma: float) -> list[int]:
+    """Таблица уровней/гаммы для bw_levels (256 значений)."""
     black = max(0, min(255, int(black)))
     white = max(0, min(255, int(white)))
     if white <= black:
@@ -40,7 +157,7 @@ def bw_levels(img: Image.Image, black: int, white: int, gamma: float) -> Image.I
     """Линейная и нелинейная коррекция чёрно-белого изображения
     Если вход не L — сначала конвертируем в L.
     """
-    lut = _build_levels_lut(black, white, gamma)
+    lut = levels_lut(black, white, gamma)
     imgL = img if img.mode == "L" else img.convert("L")
     return imgL.point(lut)
 
@@ -64,28 +181,6 @@ def flip_h(img: Image.Image) -> Image.Image:
 def flip_v(img: Image.Image) -> Image.Image:
     return img.transpose(Image.FLIP_TOP_BOTTOM)
 
-def _pil_to_cv_gray(img: Image.Image) -> np.ndarray:
-    """PIL -> OpenCV (uint8, однотоновое)"""
-    if img.mode != "L":
-        img = img.convert("L")
-    return np.array(img, dtype=np.uint8)
-
-def _pil_to_cv_bgr(img: Image.Image) -> np.ndarray:
-    """PIL -> OpenCV (BGR)"""
-    if img.mode != "RGB":
-        img = img.convert("RGB")
-    arr = np.array(img, dtype=np.uint8)
-    return cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
-
-def _cv_to_pil_from_gray(arr: np.ndarray) -> Image.Image:
-    arr = np.clip(arr, 0, 255).astype(np.uint8)
-    return Image.fromarray(arr, mode="L")
-
-def _cv_to_pil_from_bgr(arr: np.ndarray) -> Image.Image:
-    arr = cv2.cvtColor(arr, cv2.COLOR_BGR2RGB)
-    arr = np.clip(arr, 0, 255).astype(np.uint8)
-    return Image.fromarray(arr, mode="RGB")
-
 _MORPH_MAP = {
     "erosion":        ("basic", cv2.erode),
     "dilation":       ("basic", cv2.dilate),
@@ -96,6 +191,18 @@ _MORPH_MAP = {
     "blackhat":       ("ex",    cv2.MORPH_BLACKHAT),   # «Чёрная шляпа»
 }
 
+# сколько раз ядро «дотягивается» за одну итерацию (открытие = эрозия + дилатация и т.п.)
+_MORPH_REACH = {
+    "erosion": 1, "dilation": 1, "gradient": 1,
+    "opening": 2, "closing": 2, "tophat": 2, "blackhat": 2,
+}
+
+def morph_halo(op: str, kernel_shape: tuple[int, int], iterations: int = 1) -> tuple[int, int]:
+    """Ореол (по y, x), которого хватает morph_apply(op, ядро kernel_shape, iterations) на краю плитки/региона."""
+    if op not in _MORPH_REACH:
+        raise ValueError(f"Unknown morph op: {op}")
+    return kernel_halo(kernel_shape, max(1, int(iterations)) * _MORPH_REACH[op])
+
 def _ensure_kernel(matrix_01: np.ndarray) -> np.ndarray:
     """0/1 -> uint8 ядро для OpenCV; если всё нули — ставим центр = 1."""
     k = (matrix_01 > 0).astype(np.uint8)
@@ -114,7 +221,7 @@ def morph_apply(img: Image.Image,
     op: 'erosion'|'dilation'|'opening'|'closing'|'gradient'|'tophat'|'blackhat'
     kernel_matrix: 2D ndarray из 0/1
     iterations: >=1
-    mode: 'L' — конвертировать в серое; 'RGB' — по каналам
+    mode: 'L' — конвертировать в серое; 'RGB' — по каналам (альфа RGBA сохраняется)
     """
     if op not in _MORPH_MAP:
         raise ValueError(f"Unknown morph op: {op}")
@@ -122,39 +229,34 @@ def morph_apply(img: Image.Image,
     kernel = _ensure_kernel(np.asarray(kernel_matrix, dtype=np.uint8))
 
     kind, fn = _MORPH_MAP[op]
+    halo = morph_halo(op, kernel.shape, iterations)
+    # крупные пресеты/прямоугольники — через разложение (стоимость не растёт с площадью ядра)
+    rects = decompose_kernel(kernel) if max(kernel.shape) >= DECOMPOSE_MIN_SIZE else None
 
-    if mode == "L":
-        src = _pil_to_cv_gray(img)
-        if kind == "basic":
-            out = fn(src, kernel, iterations=iterations)
-        else:
-            out = cv2.morphologyEx(src, fn, kernel, iterations=iterations)
-        return _cv_to_pil_from_gray(out)
-
-    # RGB по каналам (обработка в BGR, но поканально)
-    src_bgr = _pil_to_cv_bgr(img)
-    channels = cv2.split(src_bgr)  # B, G, R
-    out_ch = []
-    for chan in channels:
+    def morph(tile: np.ndarray) -> np.ndarray:
+        if rects is not None:
+            return morph_rects(tile, op, rects, iterations)
         if kind == "basic":
-            ch = fn(chan, kernel, iterations=iterations)
-        else:
-            ch = cv2.morphologyEx(chan, fn, kernel, iterations=iterations)
-        out_ch.append(ch)
-    out_bgr = cv2.merge(out_ch)
-    return _cv_to_pil_from_bgr(out_bgr)
-
-def _np_from_pil(img: Image.Image) -> np.ndarray:
-    arr = np.array(img, dtype=np.float32)
-    return arr
+            return fn(tile, kernel, iterations=iterations)
+        return cv2.morphologyEx(tile, fn, kernel, iterations=iterations)
 
-def _pil_from_np(arr: np.ndarray, mode_like: Image.Image) -> Image.Image:
-    # подчищаем диапазон и тип
-    arr = np.clip(arr, 0, 255).astype(np.uint8)
-    return Image.fromarray(arr, mode_like.mode if mode_like.mode != "P" else "RGB")
+    if mode == "L":
+        src = np.asarray(img if img.mode == "L" else img.convert("L"))
+        return Image.fromarray(run_tiled(src, morph, halo), mode="L")
+
+    # RGB: операция поканальная, поэтому считаем сразу по HxWxC буферу в исходном порядке
+    # каналов (без split/merge и BGR); альфа переносится как есть
+    base = img if img.mode in ("RGB", "RGBA") else img.convert("RGB")
+    arr = np.asarray(base)
+    out = run_tiled(arr, morph, halo)
+    if base.mode == "RGBA":
+        out[:, :, 3] = arr[:, :, 3]
+    return Image.fromarray(out, mode=base.mode)
 
 def _convolve2d_single(channel: np.ndarray, kernel: np.ndarray) -> np.ndarray:
-    """2D свёртка одного канала (same, зеркальная рамка)."""
+    """2D свёртка одного канала (same, зеркальная рамка).
+    Эталонная (медленная) реализация; в работе используется convolution.convolve_u8.
+    """
     kh, kw = kernel.shape
     pad_y, pad_x = kh // 2, kw // 2
     padded = np.pad(channel, ((pad_y, pad_y), (pad_x, pad_x)), mode="reflect")
@@ -168,51 +270,60 @@ def _convolve2d_single(channel: np.ndarray, kernel: np.ndarray) -> np.ndarray:
             out[y, x] = float((roi * k).sum())
     return out
 
-def _convolve_image(img: Image.Image, kernel: np.ndarray, *, mode: str, normalize: bool) -> Image.Image:
+def _convolve_image(img: Image.Image, kernel: np.ndarray, *, mode: str, normalize: bool,
+                    backend: str = "auto") -> Image.Image:
     """
     mode: "L" (обработка в яркости) или "RGB" (поканально).
     normalize: если True — делим ядро на сумму (если сумма != 0).
+    backend: бэкенд convolution.convolve_u8 ('auto' — выбрать по ядру).
     """
     if normalize:
         s = float(kernel.sum())
         if abs(s) > 1e-12:
             kernel = kernel / s
 
+    # бэкенд и разложение ядра — один раз на всё изображение, а не в каждой плитке
+    backend, terms = plan_convolution(np.asarray(kernel, dtype=np.float32), backend)
+    halo = kernel_halo(kernel.shape)
+
+    def conv(tile: np.ndarray) -> np.ndarray:
+        return convolve_u8(tile, kernel, backend=backend, terms=terms)
+
+    def run(src: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        if backend == "fft":
+            # FFT и так идёт блоками; округление в нём зависит от положения блока
+            return convolve_u8(src, kernel, backend=backend, out=out)
+        return run_tiled(src, conv, halo, out=out)
+
     if mode == "L":
-        src = img.convert("L")
-        ch = _np_from_pil(src)
-        out = _convolve2d_single(ch, kernel)
-        return _pil_from_np(out, src).convert(img.mode)
+        src = img if img.mode == "L" else img.convert("L")
+        out = run(np.asarray(src))
+        res = Image.fromarray(out, mode="L")
+        return res if img.mode == "L" else res.convert(img.mode)
+
+    # RGB: все каналы за один вызов по чередующемуся HxWxC буферу, альфа — без изменений
+    base = img if img.mode in ("RGB", "RGBA") else img.convert("RGB")
+    arr = np.asarray(base)
+    if base.mode == "RGBA":
+        out = np.empty_like(arr)
+        out[:, :, 3] = arr[:, :, 3]
+        run(arr[:, :, :3], out=out[:, :, :3])
     else:
-        # RGB по каналам
-        if img.mode not in ("RGB", "RGBA"):
-            base = img.convert("RGB")
-        else:
-            base = img
-        arr = _np_from_pil(base)
-        if base.mode == "RGBA":
-            rgb = arr[:, :, :3]
-            a = arr[:, :, 3]
-        else:
-            rgb = arr
-            a = None
-
-        out_rgb = []
-        for c in range(3):
-            ch = rgb[:, :, c]
-            conv = _convolve2d_single(ch, kernel)
-            out_rgb.append(conv)
-        out = np.stack(out_rgb, axis=2)
-        if a is not None:
-            out = np.concatenate([out, a[..., None]], axis=2)
-        return _pil_from_np(out, base)
+        out = run(arr)
+    return Image.fromarray(out, mode=base.mode)
 
 def _median_filter(img: Image.Image, ksize: int, *, mode: str) -> Image.Image:
-    # используем встроенный PIL, но уважаем режим
+    # медиана по буферу сразу для всех каналов; режим уважаем
+    def med(tile: np.ndarray) -> np.ndarray:
+        return median_filter(tile, ksize)
+
     if mode == "L":
-        return img.convert("L").filter(ImageFilter.MedianFilter(size=ksize)).convert(img.mode)
-    else:
-        return img.filter(ImageFilter.MedianFilter(size=ksize))
+        src = img if img.mode == "L" else img.convert("L")
+        res = Image.fromarray(run_tiled(np.asarray(src), med, ksize // 2), mode="L")
+        return res if img.mode == "L" else res.convert(img.mode)
+    if img.mode in ("L", "LA", "RGB", "RGBA"):
+        return Image.fromarray(run_tiled(np.asarray(img), med, ksize // 2), mode=img.mode)
+    return img.filter(ImageFilter.MedianFilter(size=ksize))
 
 def _emboss_kernel() -> np.ndarray:
     return np.array([[-2,-1, 0],
@@ -251,9 +362,11 @@ def filter_apply(img: Image.Image,
     op: 'sharpen' | 'motion' | 'emboss' | 'median' | 'custom'
     mode: 'L'|'RGB'
     normalize: для свёрток с произвольным ядром
-    extra: {'median_size': int, 'motion_len': int, 'motion_angle': float}
+    extra: {'median_size': int, 'motion_len': int, 'motion_angle': float,
+            'backend': бэкенд свёртки, по умолчанию 'auto'}
     """
     extra = extra or {}
+    backend = extra.get("backend", "auto")
 
     if op == "median":
         ksize = int(extra.get("median_size", 3))
@@ -262,19 +375,19 @@ def filter_apply(img: Image.Image,
 
     if op == "emboss":
         k = _emboss_kernel()
-        return _convolve_image(img, k, mode=mode, normalize=False)
+        return _convolve_image(img, k, mode=mode, normalize=False, backend=backend)
 
     if op == "sharpen":
         k = _sharpen_kernel()
         # нормализацию для sharpen обычно НЕ делаем, иначе эффект ослабнет
-        return _convolve_image(img, k, mode=mode, normalize=False)
+        return _convolve_image(img, k, mode=mode, normalize=False, backend=backend)
 
     if op == "motion":
         L = int(extra.get("motion_len", 9))
         ang = float(extra.get("motion_angle", 0.0))
         k = _motion_kernel(L, ang)
         # уже нормировано
-        return _convolve_image(img, k, mode=mode, normalize=False)
+        return _convolve_image(img, k, mode=mode, normalize=False, backend=backend)
 
     # custom
     if kernel is None:
@@ -282,4 +395,4 @@ def filter_apply(img: Image.Image,
         k = np.zeros((3,3), dtype=np.float32); k[1,1] = 1.0
     else:
         k = np.array(kernel, dtype=np.float32)
-    return _convolve_image(img, k, mode=mode, normalize=normalize)
\ No newline at end of file
+    return _convolve_image(img, k, mode=mode, normalize=normalize, backend=backend)
\ No newline at end of file
@@ -1,15 +1,19 @@
 import tkinter as tk
-from imgviewer.services import transforms as Sx  # для предпросмотра
+from imgviewer.ui.preview_dialog import PreviewDialogMixin
 
-class AdjustBSCDialog(tk.Toplevel):
+PREVIEW_DEBOUNCE_MS = 30   # пауза после последнего движения ползунка
+
+class AdjustBSCDialog(PreviewDialogMixin, tk.Toplevel):
     """Диалог Яркость/Насыщенность/Контраст с живым предпросмотром"""
-    def __init__(self, master, before_image, on_preview, on_apply, on_cancel, init=(1.0, 1.0, 1.0)):
+    def __init__(self, master, before_image, on_preview, on_apply, on_cancel, init=(1.0, 1.0, 1.0),
+                 preview_scale=1.0, visible_region=None):
         super().__init__(master)
         self.title("Коррекция: яркость/насыщенность/контраст")
         self.resizable(False, False)
 
         self._before = before_image
-        self._on_preview = on_preview      # принимает PIL.Image (временная картинка)
+        self._init_preview(before_image, preview_scale, visible_region)
+        self._on_preview = on_preview      # принимает PIL.Image (временная картинка) и её масштаб
         self._on_apply = on_apply          # принимает (bright, sat, contr)
         self._on_cancel = on_cancel
 
@@ -38,9 +42,11 @@ class AdjustBSCDialog(tk.Toplevel):
 
         self.protocol("WM_DELETE_WINDOW", self._cancel)
 
-        # бинды для живого предпросмотра
+        # бинды для живого предпросмотра: события ползунка копятся и уходят одним расчётом
+        self._preview_id = None
+
         def _on_var_change(_name: str, _index: str, _op: str) -> None:
-            self._render_preview()
+            self._schedule_preview()
         for var in (self.v_b, self.v_s, self.v_c):
             var.trace_add("write", _on_var_change)
 
@@ -49,16 +55,29 @@ class AdjustBSCDialog(tk.Toplevel):
     def _current_params(self):
         return (self.v_b.get(), self.v_s.get(), self.v_c.get())
 
+    def _schedule_preview(self):
+        if self._preview_id is not None:
+            try: self.after_cancel(self._preview_id)
+            except Exception: pass
+        self._preview_id = self.after(PREVIEW_DEBOUNCE_MS, self._render_preview)
+
     def _render_preview(self):
+        self._preview_id = None
         if not self.winfo_exists():
             return
         if self.preview_var.get():
             b, s, c = self._current_params()
-            temp = Sx.adjust_bsc(self._before, b, s, c)
-            self._on_preview(temp)
+            self._submit_preview(lambda proxy, region: proxy.bsc(b, s, c, region=region), self._on_preview)
         else:
+            self._worker.cancel()
             self._on_preview(self._before)
 
+    def _preview_enabled(self):
+        return self.preview_var.get()
+
+    def _refresh_preview(self):
+        self._schedule_preview()
+
     def _apply(self):
         b, s, c = self._current_params()
         self._on_apply(b, s, c)
@@ -71,3 +90,9 @@ class AdjustBSCDialog(tk.Toplevel):
         self._on_preview(self._before)
         self._on_cancel()
         self.destroy()
+
+    def destroy(self):
+        if self._preview_id is not None:
+            try: self.after_cancel(self._preview_id)
+            except Exception: pass
+        super().destroy()
@@ -1,18 +1,18 @@
 import tkinter as tk
-from imgviewer.services import transforms as Sx
+from imgviewer.services.histogram import attach_histogram
+from imgviewer.ui.preview_dialog import PreviewDialogMixin
 
-class BWLevelsDialog(tk.Toplevel):
+class BWLevelsDialog(PreviewDialogMixin, tk.Toplevel):
     """Диалог уровни/гамма для Ч/Б с предпросмотром"""
     def __init__(self, master, before_image, on_preview, on_apply, on_cancel,
-                 init_black=0, init_white=255, init_gamma=1.0):
+                 init_black=0, init_white=255, init_gamma=1.0, preview_scale=1.0,
+                 visible_region=None):
         super().__init__(master)
         self.title("Коррекция Ч/Б: уровни и гамма")
         self.resizable(False, False)
 
         self._before = before_image
-        # база для предпросмотра всегда L
-        self._base_L = before_image if before_image.mode == "L" else before_image.convert("L")
-
+        self._init_preview(before_image, preview_scale, visible_region)   # результат предпросмотра всегда L
         self._on_preview = on_preview      # принимает PIL.Image
         self._on_apply = on_apply          # принимает (black, white, gamma)
         self._on_cancel = on_cancel
@@ -58,11 +58,25 @@ class BWLevelsDialog(tk.Toplevel):
             return
         if self.preview_var.get():
             black, white, gamma = self._current_params()
-            temp = Sx.bw_levels(self._base_L, black, white, gamma)
-            self._on_preview(temp)
+            self._submit_preview(lambda proxy, region: self._levels_job(proxy, black, white, gamma, region),
+                                 self._on_preview)
         else:
+            self._worker.cancel()
             self._on_preview(self._before)
 
+    def _levels_job(self, proxy, black, white, gamma, region):
+        """Фоновая часть предпросмотра: картинка + её гистограмма без прохода по кадру
+        (по пикселям той же копии/области, что на экране, а не полного исходника)."""
+        temp = proxy.levels(black, white, gamma, region=region)
+        attach_histogram(temp, proxy.levels_histogram(black, white, gamma, region=region))
+        return temp
+
+    def _preview_enabled(self):
+        return self.preview_var.get()
+
+    def _refresh_preview(self):
+        self._render_preview()
+
     def _apply(self):
         self._on_apply(*self._current_params())
         self.destroy()
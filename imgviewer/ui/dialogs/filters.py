@@ -5,8 +5,9 @@ from tkinter import ttk, messagebox, simpledialog
 import numpy as np
 import os, json
 from typing import Optional
+from imgviewer.ui.preview_dialog import PreviewDialogMixin, PreviewScale, VisibleRegion
 
-class FiltersDialog(tk.Toplevel):
+class FiltersDialog(PreviewDialogMixin, tk.Toplevel):
     """
     Окно фильтров свёртки:
       • Повышение резкости
@@ -34,13 +35,15 @@ class FiltersDialog(tk.Toplevel):
         "Sharpen 3×3", "Emboss 3×3", "Edge (Sobel X)"
     ]
 
-    def __init__(self, master, before_img, on_preview, on_apply, on_cancel):
+    def __init__(self, master, before_img, on_preview, on_apply, on_cancel, preview_scale: PreviewScale = 1.0,
+                 visible_region: Optional[VisibleRegion] = None):
         super().__init__(master)
         self.title("Фильтры (свёртка/медиана)")
         self.resizable(True, True)
 
         # внешние колбэки
         self.before_img = before_img
+        self._init_preview(before_img, preview_scale, visible_region)
         self.on_preview = on_preview
         self.on_apply = on_apply
         self.on_cancel = on_cancel
@@ -495,26 +498,36 @@ class FiltersDialog(tk.Toplevel):
         return k
 
     def _preview(self):
+        # параметры читаем здесь (Tk — только главный поток), считаем в фоне
+        self._live_preview_id = None
         try:
-            from imgviewer.services import transforms as Sx
             op = self.op.get()
             mode = self.mode.get()
 
             if op == "median":
                 ksize = self._force_odd(self.median_size.get())
-                out = Sx.filter_apply(self.before_img, op, None, mode, False,
-                                      extra={"median_size": ksize})
+                job = lambda proxy, region: proxy.filter(op, None, mode, False, extra={"median_size": ksize},
+                                                         region=region)
             else:
                 k = self._get_kernel()
-                out = Sx.filter_apply(self.before_img, op, k, mode, self.normalize.get(),
-                                      extra={"motion_len": self._force_odd(self.motion_len.get()),
-                                             "motion_angle": float(self.motion_angle.get())})
-            self.on_preview(out)
+                normalize = self.normalize.get()
+                extra = {"motion_len": self._force_odd(self.motion_len.get()),
+                         "motion_angle": float(self.motion_angle.get())}
+                job = lambda proxy, region: proxy.filter(op, k, mode, normalize, extra=extra, region=region)
         except Exception as e:
             messagebox.showerror("Ошибка предпросмотра", str(e))
+            return
+        self._submit_preview(job, self.on_preview, lambda e: messagebox.showerror("Ошибка предпросмотра", str(e)))
+
+    def _preview_enabled(self):
+        return self.preview_auto.get()
+
+    def _refresh_preview(self):
+        self._preview()
 
     def _maybe_preview(self):
         if not self.preview_auto.get():
+            self._worker.cancel()
             if self._live_preview_id is not None:
                 try: self.after_cancel(self._live_preview_id)
                 except Exception: pass
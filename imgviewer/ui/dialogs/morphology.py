@@ -5,8 +5,10 @@ from tkinter import ttk, messagebox
 import numpy as np
 import os, json
 from tkinter import simpledialog
+from typing import Optional
+from imgviewer.ui.preview_dialog import PreviewDialogMixin, PreviewScale, VisibleRegion
 
-class MorphologyDialog(tk.Toplevel):
+class MorphologyDialog(PreviewDialogMixin, tk.Toplevel):
     OPS = [
         ("Эрозия", "erosion"),
         ("Дилатация", "dilation"),
@@ -18,13 +20,15 @@ class MorphologyDialog(tk.Toplevel):
     ]
     PRESETS_MAIN = ["Ручной", "Квадрат", "Крест", "Эллипс", "Ромб", "Центр"]
 
-    def __init__(self, master, before_img, on_preview, on_apply, on_cancel):
+    def __init__(self, master, before_img, on_preview, on_apply, on_cancel, preview_scale: PreviewScale = 1.0,
+                 visible_region: Optional[VisibleRegion] = None):
         super().__init__(master)
         self.title("Морфологические операции")
         self.resizable(True, True)
 
         # внешние колбэки
         self.before_img = before_img
+        self._init_preview(before_img, preview_scale, visible_region)
         self.on_preview = on_preview
         self.on_apply = on_apply
         self.on_cancel = on_cancel
@@ -477,19 +481,29 @@ class MorphologyDialog(tk.Toplevel):
         return k
 
     def _preview(self):
+        # параметры читаем здесь (Tk — только главный поток), считаем в фоне
+        self._live_preview_id = None
         try:
-            from imgviewer.services import transforms as Sx
             k = self._get_kernel()
-            out = Sx.morph_apply(self.before_img, self.op.get(), k,
-                                 int(self.iterations.get()), self.mode.get())
-            self.on_preview(out)
+            op, iterations, mode = self.op.get(), int(self.iterations.get()), self.mode.get()
         except Exception as e:
             messagebox.showerror("Ошибка предпросмотра", str(e))
+            return
+        self._submit_preview(lambda proxy, region: proxy.morph(op, k, iterations, mode, region=region),
+                             self.on_preview,
+                             lambda e: messagebox.showerror("Ошибка предпросмотра", str(e)))
+
+    def _preview_enabled(self):
+        return self.preview_auto.get()
+
+    def _refresh_preview(self):
+        self._preview()
 
     def _maybe_preview(self):
         """Если чекбокс выключен — показываем исходное изображение.
         Если включён — живой предпросмотр (с коротким дебаунсом)."""
         if not self.preview_auto.get():
+            self._worker.cancel()
             if self._live_preview_id is not None:
                 try: self.after_cancel(self._live_preview_id)
                 except Exception: pass
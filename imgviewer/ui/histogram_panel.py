@@ -2,7 +2,11 @@ from __future__ import annotations
 import tkinter as tk
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from imgviewer.services.histogram import histogram_data
+from imgviewer.services.histogram import histogram_data, sampled_histogram
+
+# Во время предпросмотра рисуется приближённая гистограмма по выборке; если новых
+# изменений нет EXACT_DELAY_MS, она заменяется точной.
+EXACT_DELAY_MS = 300
 
 class HistogramPanel(tk.Frame):
     """Панель: радиокнопки выбора варианта + чекбоксы каналов + график matplotlib."""
@@ -32,11 +36,16 @@ class HistogramPanel(tk.Frame):
         self._canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.X, padx=8, pady=(4,8))
 
         self._provider = None
+        self._exact_id = None
 
     def set_provider(self, provider):
         self._provider = provider
 
-    def redraw(self):
+    def redraw(self, interactive: bool = False):
+        """interactive=True — быстрая гистограмма по выборке (точная дорисуется после паузы)."""
+        if self._exact_id is not None:
+            self.after_cancel(self._exact_id)
+            self._exact_id = None
         self._ax.clear()
         if not self._provider:
             self._canvas.draw_idle(); return
@@ -46,13 +55,18 @@ class HistogramPanel(tk.Frame):
         if img is None:
             self._canvas.draw_idle(); return
 
-        data = histogram_data(img)
-        xs = list(range(256))
+        data = sampled_histogram(img) if interactive else histogram_data(img)
+        if data["error"] > 0:
+            self._exact_id = self.after(EXACT_DELAY_MS, self.redraw)
+        lo, hi = data["range"]
+        # 16-битные и float-кадры: 256 столбцов покрывают [lo, hi] настоящих значений
+        step = (hi - lo) / 255.0
+        xs = [lo + i * step for i in range(256)]
         if data["mode"] == "L":
             hist = data["L"]
             self._ax.plot(xs, hist, color="gray", linewidth=1, label="L")
             ymax = max(hist) or 1
-            mode_text = "L"
+            mode_text = img.mode   # L или I;16 / I / F
         else:
             r, g, b = data["R"], data["G"], data["B"]
             show_r, show_g, show_b = self._ch_r.get(), self._ch_g.get(), self._ch_b.get()
@@ -72,13 +86,14 @@ class HistogramPanel(tk.Frame):
             mode_text = "RGB"
 
         # оформление
-        self._ax.set_xlim(0, 255)
+        self._ax.set_xlim(lo, hi if hi > lo else lo + 1)
         self._ax.set_ylim(0, ymax * 1.05)
-        self._ax.set_xlabel("Уровень яркости (0–255)")
+        self._ax.set_xlabel(f"Уровень яркости ({lo:g}–{hi:g})")
         self._ax.set_ylabel("Частота")
         var_map = {"original": "Оригинал", "current": "Текущая"}
         title = var_map.get(kind, "Текущая")
-        self._ax.set_title(f"{title} — {mode_text}")
+        approx = f" (≈, ±{data['error'] * 100:.1f}%)" if data["error"] > 0 else ""
+        self._ax.set_title(f"{title} — {mode_text}{approx}")
         self._ax.legend(loc="upper right", fontsize=8)
         self._ax.grid(False)
         for spine in ("top","right"):
@@ -1,16 +1,90 @@
 from __future__ import annotations
+import math
 import tkinter as tk
+from collections import OrderedDict
 from PIL import Image, ImageTk
+from imgviewer.services.preview import PatchedImage
+from imgviewer.services.pyramid import ImagePyramid
+
+# Холст рисует только видимую часть картинки, нарезанную на тайлы в экранных пикселях.
+# Тайл растеризуется от подходящего уровня пирамиды (resize с box), готовые тайлы лежат
+# в LRU — память пропорциональна размеру экрана, а не картинки × zoom².
+# Пока крутится колесо, новые тайлы рисуются черновым NEAREST от уровня пирамиды; через REFINE_MS
+# после последнего шага видимые черновики перерисовываются LANCZOS.
+# Tk-картинки не пересоздаются: устаревший тайл перерисовывается в свой же PhotoImage
+# (paste), вытесненные из LRU ждут повторного использования в пуле по (режим, размер).
+# Предпросмотр области (PatchedImage) рисуется без сборки кадра: пирамида строится по его основе
+# и живёт, пока основа та же, а кусок-заплатка накладывается на задевающие его тайлы при их
+# растеризации. При смене заплатки перерисовываются только тайлы старой и новой области.
+
+TILE_SIZE = 256      # сторона тайла на экране, пиксели
+TILE_CACHE = 192     # тайлов в LRU (не меньше, чем видно на экране)
+SCROLL_UNIT = 32     # шаг прокрутки стрелками полосы, экранные пиксели
+REFINE_MS = 150      # пауза после зума колесом до чистовой перерисовки
+DRAFT_RESAMPLE = Image.NEAREST
+PHOTO_POOL = 64      # свободных PhotoImage в пуле
+
+_STALE, _DRAFT, _FINAL = 0, 1, 2   # качество тайла в LRU
+
+
+def _axis_view(view: float, viewport: int, content: int) -> float:
+    """Смещение окна по оси: картинка меньше окна — по центру, иначе — в пределах картинки."""
+    if content <= viewport:
+        return -(viewport - content) / 2.0
+    return max(0.0, min(float(content - viewport), view))
+
+
+def _base_of(img: Image.Image) -> Image.Image:
+    return img.base if isinstance(img, PatchedImage) else img
+
+
+def _changed_box(old: Image.Image | None, new: Image.Image) -> tuple[int, int, int, int] | None:
+    """Где new отличается от old (пиксели картинки); None — неизвестно, считаем что везде."""
+    if old is None or old.size != new.size or old.mode != new.mode or _base_of(old) is not _base_of(new):
+        return None
+    boxes = [im.box for im in (old, new) if isinstance(im, PatchedImage)]
+    if not boxes:
+        return None
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def _resample_margin(z: float) -> int:
+    """Радиус ресемплинга (LANCZOS и уровни пирамиды) в пикселях картинки при масштабе z."""
+    return int(8 / min(1.0, z)) + 1
+
+
+def _tile_range(view: float, viewport: int, content: int, tile: int) -> range:
+    lo = max(0.0, view)
+    hi = min(float(content), view + viewport)
+    if hi <= lo:
+        return range(0)
+    return range(int(lo // tile), int((hi - 1) // tile) + 1)
+
 
 class ImageCanvas(tk.Frame):
-    """Виджет отображения изображения"""
+    """Виджет отображения изображения: зум колесом, панорама перетаскиванием и полосами прокрутки"""
     def __init__(self, master, *, bg="#111", min_zoom=0.1, max_zoom=8.0, step=1.1):
         super().__init__(master, bg=bg)
-        self._label = tk.Label(self, bg=bg)
-        self._label.pack(expand=True, fill=tk.BOTH)
+        self._canvas = tk.Canvas(self, bg=bg, highlightthickness=0)
+        self._hbar = tk.Scrollbar(self, orient=tk.HORIZONTAL, command=self._xview)
+        self._vbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._yview)
+        self._canvas.grid(row=0, column=0, sticky="nsew")
+        self._vbar.grid(row=0, column=1, sticky="ns")
+        self._hbar.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
 
         self._pil_image: Image.Image | None = None
-        self._tk_image: ImageTk.PhotoImage | None = None
+        self._pyramid: ImagePyramid | None = None   # строится лениво, сбрасывается при смене картинки
+        self._scale = 1.0   # пикселей _pil_image на пиксель исходника (< 1 — уменьшенный предпросмотр)
+
+        self._view = [0.0, 0.0]   # левый верхний угол окна в экранных пикселях картинки
+        self._tiles: OrderedDict[tuple, list] = OrderedDict()   # LRU: [PhotoImage, качество, (режим, размер)]
+        self._pool: dict[tuple, list[ImageTk.PhotoImage]] = {}   # (режим, размер) -> свободные
+        self._items: dict[tuple[int, int], int] = {}   # (tx, ty) -> id элемента холста
+        self._drag = None
+        self._refine_id = None
 
         self.min_zoom = float(min_zoom)
         self.max_zoom = float(max_zoom)
@@ -18,43 +92,278 @@ class ImageCanvas(tk.Frame):
         self.zoom = 1.0
 
         self._on_zoom_cb = None
+        self._on_view_cb = None
 
-        # зум только над картинкой
-        self._label.bind("<MouseWheel>", self._on_mousewheel)
-        self._label.bind("<Double-Button-1>", lambda e: self.reset_zoom())
+        # зум колесом (Windows/macOS — MouseWheel, X11 — Button-4/5), панорама левой кнопкой
+        self._canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self._canvas.bind("<Button-4>", lambda e: self._apply_zoom(+1, e.x, e.y))
+        self._canvas.bind("<Button-5>", lambda e: self._apply_zoom(-1, e.x, e.y))
+        self._canvas.bind("<ButtonPress-1>", self._on_press)
+        self._canvas.bind("<B1-Motion>", self._on_drag)
+        self._canvas.bind("<Double-Button-1>", lambda e: self.reset_zoom())
+        self._canvas.bind("<Configure>", self._on_configure)
 
     # внешний код реагирует на изменение масштаба
     def set_on_zoom(self, cb):
         self._on_zoom_cb = cb
 
-    def set_image(self, img: Image.Image | None):
-        self._pil_image = img
+    def set_on_view(self, cb):
+        """cb() — после любого изменения видимой части (зум, панорама, прокрутка, размер окна);
+        вызывается на каждый шаг, откладывать пересчёт — дело вызывающего."""
+        self._on_view_cb = cb
+
+    def _view_changed(self):
+        if self._on_view_cb:
+            self._on_view_cb()
+
+    def _on_configure(self, _event=None):
         self.refresh()
+        self._view_changed()
 
-    def set_zoom(self, z: float):
-        self.zoom = max(self.min_zoom, min(self.max_zoom, float(z)))
+    def set_image(self, img: Image.Image | None, *, scale: float = 1.0):
+        old = self._display_size()
+        if img is not self._pil_image:
+            box = _changed_box(self._pil_image, img) if img is not None and scale == self._scale else None
+            base = _base_of(img) if img is not None else None
+            if self._pyramid is None or self._pyramid.image is not base:
+                self._pyramid = ImagePyramid(base) if base is not None else None
+            self._invalidate(box)
+        self._pil_image = img
+        self._scale = float(scale)
+        new = self._display_size()
+        # размер на экране поменялся (поворот и т.п.) — сохраняем относительное положение окна
+        for i in (0, 1):
+            if old[i] > 0 and new[i] != old[i]:
+                self._view[i] *= new[i] / old[i]
         self.refresh()
+
+    def preview_scale(self) -> float:
+        """Во сколько раз можно уменьшить картинку для предпросмотра без потерь на экране."""
+        return min(1.0, self.zoom)
+
+    def visible_region(self) -> tuple[int, int, int, int] | None:
+        """Видимая часть картинки (x0, y0, x1, y1) в пикселях исходника; None — видна целиком."""
+        if self._pil_image is None:
+            return None
+        vw, vh = self._viewport()
+        if vw <= 1 or vh <= 1:
+            return None   # виджет ещё не размещён
+        dw, dh = self._display_size()
+        if vw >= dw and vh >= dh:
+            return None
+        sw, sh = self._source_size()
+        x0 = max(0.0, self._view[0]) / self.zoom
+        y0 = max(0.0, self._view[1]) / self.zoom
+        x1 = min(float(dw), self._view[0] + vw) / self.zoom
+        y1 = min(float(dh), self._view[1] + vh) / self.zoom
+        return int(x0), int(y0), min(sw, int(x1) + 1), min(sh, int(y1) + 1)
+
+    def set_zoom(self, z: float, anchor: tuple[int, int] | None = None, *, draft: bool = False):
+        """
+        Установить масштаб; anchor — точка окна, которая остаётся на месте (по умолчанию центр).
+        draft=True — новые тайлы черновые, чистовая перерисовка отложена до паузы.
+        """
+        z = max(self.min_zoom, min(self.max_zoom, float(z)))
+        vw, vh = self._viewport()
+        ax, ay = anchor if anchor is not None else (vw / 2.0, vh / 2.0)
+        k = z / self.zoom
+        self._view[0] = (self._view[0] + ax) * k - ax
+        self._view[1] = (self._view[1] + ay) * k - ay
+        self.zoom = z
+        self.refresh(draft=draft)
         if self._on_zoom_cb:
             self._on_zoom_cb(self.zoom)
+        self._view_changed()
 
     def reset_zoom(self):
         self.set_zoom(1.0)
 
     def _on_mousewheel(self, event):
-        self._apply_zoom(+1 if event.delta > 0 else -1)
+        self._apply_zoom(+1 if event.delta > 0 else -1, event.x, event.y)
 
-    def _apply_zoom(self, direction: int):
+    def _apply_zoom(self, direction: int, x: int | None = None, y: int | None = None):
         factor = self.step if direction > 0 else (1.0 / self.step)
-        self.set_zoom(self.zoom * factor)
+        self.set_zoom(self.zoom * factor, None if x is None else (x, y), draft=True)
 
-    def refresh(self):
-        if self._pil_image is None:
-            self._label.config(image="")
-            self._tk_image = None
+    # ---- панорама ----
+    def _on_press(self, event):
+        self._drag = (event.x, event.y, self._view[0], self._view[1])
+
+    def _on_drag(self, event):
+        if self._drag is None:
             return
+        x, y, vx, vy = self._drag
+        self._view[0] = vx - (event.x - x)
+        self._view[1] = vy - (event.y - y)
+        self.refresh()
+        self._view_changed()
+
+    def _scroll(self, axis: int, *args):
+        """Команда полосы прокрутки: ('moveto', доля) или ('scroll', n, 'units'|'pages')."""
+        size = self._display_size()[axis]
+        if not args or size <= 0:
+            return
+        if args[0] == "moveto":
+            self._view[axis] = float(args[1]) * size
+        elif args[0] == "scroll":
+            n = int(args[1])
+            unit = self._viewport()[axis] if args[2] == "pages" else SCROLL_UNIT
+            self._view[axis] += n * unit
+        self.refresh()
+        self._view_changed()
+
+    def _xview(self, *args):
+        self._scroll(0, *args)
+
+    def _yview(self, *args):
+        self._scroll(1, *args)
+
+    # ---- геометрия ----
+    def _viewport(self) -> tuple[int, int]:
+        return self._canvas.winfo_width(), self._canvas.winfo_height()
+
+    def _source_size(self) -> tuple[int, int]:
         w, h = self._pil_image.size
-        tw = max(1, int(w * self.zoom))
-        th = max(1, int(h * self.zoom))
-        img = self._pil_image.resize((tw, th), Image.LANCZOS)
-        self._tk_image = ImageTk.PhotoImage(img)
-        self._label.config(image=self._tk_image)
+        return max(1, round(w / self._scale)), max(1, round(h / self._scale))
+
+    def _pil_zoom(self) -> float:
+        """Экранных пикселей на пиксель _pil_image."""
+        return self.zoom / self._scale
+
+    def _display_size(self) -> tuple[int, int]:
+        if self._pil_image is None:
+            return 0, 0
+        w, h = self._pil_image.size
+        z = self._pil_zoom()
+        return max(1, int(w * z)), max(1, int(h * z))
+
+    def _update_scrollbars(self, vw: int, vh: int, dw: int, dh: int):
+        for bar, v, port, size in ((self._hbar, self._view[0], vw, dw), (self._vbar, self._view[1], vh, dh)):
+            if size <= 0 or size <= port:
+                bar.set(0.0, 1.0)
+            else:
+                bar.set(max(0.0, v) / size, min(float(size), v + port) / size)
+
+    # ---- отрисовка ----
+    def _release(self, entry: list):
+        if sum(len(v) for v in self._pool.values()) < PHOTO_POOL:
+            self._pool.setdefault(entry[2], []).append(entry[0])
+
+    def _invalidate(self, box: tuple[int, int, int, int] | None):
+        """
+        Картинка сменилась. box (пиксели картинки) — где она изменилась: задетые тайлы текущего
+        масштаба помечаются устаревшими, остальные остаются; None — сбросить всё.
+        """
+        z = self._pil_zoom()
+        if box is not None:
+            m = _resample_margin(z)
+            box = ((box[0] - m) * z, (box[1] - m) * z, (box[2] + m) * z, (box[3] + m) * z)
+        zkey = round(z, 9)
+        for key in list(self._tiles):
+            if box is None or key[0] != zkey:
+                self._release(self._tiles.pop(key))
+                continue
+            _, tx, ty = key
+            x0, y0 = tx * TILE_SIZE, ty * TILE_SIZE
+            if x0 < box[2] and x0 + TILE_SIZE > box[0] and y0 < box[3] and y0 + TILE_SIZE > box[1]:
+                self._tiles[key][1] = _STALE
+
+    def _tile(self, tx: int, ty: int, dw: int, dh: int, draft: bool) -> list:
+        key = (round(self._pil_zoom(), 9), tx, ty)
+        cached = self._tiles.get(key)
+        if cached is not None:
+            self._tiles.move_to_end(key)
+            if cached[1] >= (_DRAFT if draft else _FINAL):
+                return cached
+        x0, y0 = tx * TILE_SIZE, ty * TILE_SIZE
+        x1, y1 = min(dw, x0 + TILE_SIZE), min(dh, y0 + TILE_SIZE)
+        z = self._pil_zoom()
+        img = self._render((x1 - x0, y1 - y0), DRAFT_RESAMPLE if draft else Image.LANCZOS,
+                           (x0 / z, y0 / z, x1 / z, y1 / z))
+        quality = _DRAFT if draft else _FINAL
+        if cached is not None:
+            cached[0].paste(img)   # тот же PhotoImage — элемент холста обновится сам
+            cached[1] = quality
+            return cached
+        kind = (img.mode, img.size)
+        free = self._pool.get(kind)
+        if free:
+            photo = free.pop()
+            photo.paste(img)
+        else:
+            photo = ImageTk.PhotoImage(img)
+        entry = self._tiles[key] = [photo, quality, kind]
+        return entry
+
+    def _render(self, size: tuple[int, int], resample, box: tuple[float, float, float, float]) -> Image.Image:
+        """Участок box картинки (её пиксели) в размере size. Тайл, который задевает заплатку
+        предпросмотра, собирается из куска основы с ней — кадр целиком не копируется."""
+        img = self._pil_image
+        if isinstance(img, PatchedImage):
+            m = _resample_margin(self._pil_zoom())
+            px0, py0, px1, py1 = img.box
+            if box[0] - m < px1 and box[2] + m > px0 and box[1] - m < py1 and box[3] + m > py0:
+                w, h = img.size
+                a0, b0 = max(0, int(box[0]) - m), max(0, int(box[1]) - m)
+                a1, b1 = min(w, math.ceil(box[2]) + m), min(h, math.ceil(box[3]) + m)
+                local = img.base.crop((a0, b0, a1, b1))
+                local.paste(img.patch, (px0 - a0, py0 - b0))
+                return local.resize(size, resample, box=(box[0] - a0, box[1] - b0, box[2] - a0, box[3] - b0))
+        return self._pyramid.resize(size, resample, box=box)
+
+    def _schedule_refine(self):
+        if self._refine_id is not None:
+            self.after_cancel(self._refine_id)
+        self._refine_id = self.after(REFINE_MS, self._refine)
+
+    def _cancel_refine(self):
+        if self._refine_id is not None:
+            self.after_cancel(self._refine_id)
+            self._refine_id = None
+
+    def _refine(self):
+        self._refine_id = None
+        self.refresh()
+
+    def refresh(self, draft: bool = False):
+        """Перерисовать видимые тайлы; draft=True — недостающие рисуются черновыми."""
+        c = self._canvas
+        if self._pil_image is None:
+            self._cancel_refine()
+            c.delete("tile")
+            self._items.clear()
+            self._invalidate(None)
+            self._update_scrollbars(0, 0, 0, 0)
+            return
+        vw, vh = self._viewport()
+        if vw <= 1 or vh <= 1:
+            return   # ещё не размещён — нарисуем по <Configure>
+        dw, dh = self._display_size()
+        self._view[0] = _axis_view(self._view[0], vw, dw)
+        self._view[1] = _axis_view(self._view[1], vh, dh)
+
+        visible = set()
+        drafts = False
+        for ty in _tile_range(self._view[1], vh, dh, TILE_SIZE):
+            for tx in _tile_range(self._view[0], vw, dw, TILE_SIZE):
+                visible.add((tx, ty))
+                photo, final, _ = self._tile(tx, ty, dw, dh, draft)
+                drafts = drafts or final != _FINAL
+                x, y = tx * TILE_SIZE - self._view[0], ty * TILE_SIZE - self._view[1]
+                item = self._items.get((tx, ty))
+                if item is None:
+                    self._items[(tx, ty)] = c.create_image(x, y, image=photo, anchor="nw", tags="tile")
+                else:
+                    c.coords(item, x, y)
+                    c.itemconfigure(item, image=photo)
+        for key in [k for k in self._items if k not in visible]:
+            c.delete(self._items.pop(key))
+
+        # видимые тайлы только что подняты в конец LRU — вытесняются лишь невидимые
+        while len(self._tiles) > max(TILE_CACHE, len(visible)):
+            self._release(self._tiles.popitem(last=False)[1])
+        self._update_scrollbars(vw, vh, dw, dh)
+        if drafts:
+            self._schedule_refine()
+        else:
+            self._cancel_refine()
@@ -2,6 +2,7 @@ from __future__ import annotations
 import tkinter as tk
 
 class InfoPanel(tk.Frame):
+    """Сводка о файле и отдельным полем — статистика по каналам (она меняется чаще)."""
     def __init__(self, master):
         super().__init__(master)
         wrap = tk.Frame(self); wrap.pack(side=tk.TOP, expand=True, fill=tk.BOTH)
@@ -10,9 +11,21 @@ class InfoPanel(tk.Frame):
         self._text.configure(yscrollcommand=scroll.set)
         self._text.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
         scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self._stats = tk.Text(self, wrap="word", height=6, state="disabled")
+        self._stats.pack(side=tk.TOP, fill=tk.X)
+        self._shown = {}
+
+    def _fill(self, widget: tk.Text, text: str):
+        if self._shown.get(widget) == text:
+            return   # предпросмотр перерисовывается часто, а текст обычно тот же
+        self._shown[widget] = text
+        widget.configure(state="normal")
+        widget.delete("1.0", tk.END)
+        widget.insert(tk.END, text)
+        widget.configure(state="disabled")
 
     def set_text(self, text: str):
-        self._text.configure(state="normal")
-        self._text.delete("1.0", tk.END)
-        self._text.insert(tk.END, text)
-        self._text.configure(state="disabled")
+        self._fill(self._text, text)
+
+    def set_stats(self, text: str):
+        self._fill(self._stats, text)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+from typing import Callable, Optional, Union
+from PIL import Image
+from imgviewer.services.preview import PreviewProxy, Region, proxy_scale
+from imgviewer.ui.preview_worker import PreviewWorker
+
+# Общая часть диалогов с живым предпросмотром (фильтры, морфология, яркость/контраст, уровни).
+# Предпросмотр считается на уменьшенной копии в масштабе показа (PreviewProxy) — полное разрешение
+# только при «Применить», а при увеличении — лишь по видимой части кадра. Расчёт идёт в фоновом
+# потоке (PreviewWorker), до экрана доходит последний набор параметров. Когда холст меняет зум или
+# сдвигается (sync_view), предпросмотр пересчитывается, только если копии нужен другой масштаб или
+# на экране оказалась часть кадра вне уже посчитанной области.
+
+PreviewScale = Union[float, Callable[[], float]]   # масштаб копии или функция холста, его дающая
+VisibleRegion = Callable[[], Optional[Region]]
+
+__all__ = ["PreviewDialogMixin", "PreviewScale", "VisibleRegion"]
+
+
+def _covers(done: Optional[Region], need: Optional[Region]) -> bool:
+    """Посчитанная область done (None — весь кадр) содержит нужную need (None — весь кадр)."""
+    if done is None:
+        return True
+    if need is None:
+        return False
+    return done[0] <= need[0] and done[1] <= need[1] and done[2] >= need[2] and done[3] >= need[3]
+
+
+class PreviewDialogMixin:
+    """
+    Примесь для tk.Toplevel-диалогов (ставится в базовых классах перед tk.Toplevel).
+    Диалог переопределяет _preview_enabled() и _refresh_preview().
+    """
+    def _init_preview(self, before: Image.Image, preview_scale: PreviewScale = 1.0,
+                      visible_region: Optional[VisibleRegion] = None) -> None:
+        """preview_scale — число или ImageCanvas.preview_scale; visible_region — ImageCanvas.visible_region
+        (None — всегда кадр целиком)."""
+        self._preview_scale = preview_scale if callable(preview_scale) else (lambda: preview_scale)
+        self._visible_region = visible_region or (lambda: None)
+        self._proxy = PreviewProxy(before, self._preview_scale())
+        self._worker = PreviewWorker(self)
+        self._preview_box: Optional[Region] = (0, 0, 0, 0)   # что посчитано (область копии, None — всё)
+
+    def _submit_preview(self, job: Callable[[PreviewProxy, Optional[Region]], Image.Image],
+                        on_done: Callable[[Image.Image, float], None],
+                        on_error: Optional[Callable[[Exception], None]] = None) -> None:
+        """
+        Посчитать job(копия, видимая область) в фоне; on_done(картинка, масштаб копии) — в главном
+        потоке. Масштаб и область читаются здесь, поэтому вызывать из главного потока.
+        """
+        region = self._visible_region()
+        proxy = self._proxy = self._proxy.rescaled(self._preview_scale())
+        self._preview_box = proxy.region_box(region)
+        self._worker.submit(lambda: job(proxy, region), lambda out: on_done(out, proxy.scale), on_error)
+
+    def _preview_enabled(self) -> bool:
+        raise NotImplementedError
+
+    def _refresh_preview(self) -> None:
+        raise NotImplementedError
+
+    def sync_view(self) -> None:
+        """Холст сменил зум или сдвинулся: пересчитать предпросмотр, если копии нужен другой масштаб
+        или видимая часть кадра не покрыта посчитанной областью."""
+        if not self._preview_enabled():
+            return
+        if proxy_scale(self._preview_scale()) != self._proxy.scale or \
+                not _covers(self._preview_box, self._proxy.region_box(self._visible_region())):
+            self._refresh_preview()
+
+    def destroy(self):
+        self._worker.close()
+        super().destroy()
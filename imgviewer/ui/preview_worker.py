@@ -0,0 +1,109 @@
+from __future__ import annotations
+import queue
+import threading
+from typing import Callable, Optional, Tuple
+
+# Фоновый расчёт предпросмотра.
+# Операции идут в отдельном потоке (OpenCV/NumPy/PIL отпускают GIL, интерфейс не стоит).
+# Каждая заявка получает номер поколения; новая заявка вытесняет ещё не начатую,
+# а результат уже устаревшей отбрасывается — до on_done доходит только последний набор
+# параметров. Результаты передаются в главный поток через очередь, которую опрашивает
+# after (Tk нельзя трогать из чужого потока).
+
+POLL_MS = 15   # период опроса очереди, пока есть незавершённая работа
+
+Job = Tuple[int, Callable[[], object], Callable[[object], None], Optional[Callable[[Exception], None]]]
+
+
+class PreviewWorker:
+    """Один фоновый поток на диалог; submit() заменяет ожидающую заявку."""
+    def __init__(self, widget):
+        self._widget = widget
+        self._cond = threading.Condition()
+        self._pending: Optional[Job] = None
+        self._generation = 0
+        self._closed = False
+        self._busy = False
+        self._results: "queue.Queue[tuple]" = queue.Queue()
+        self._poll_id = None
+        self._thread = threading.Thread(target=self._loop, name="preview-worker", daemon=True)
+        self._thread.start()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def submit(self, fn: Callable[[], object], on_done: Callable[[object], None],
+               on_error: Optional[Callable[[Exception], None]] = None) -> int:
+        """Поставить расчёт fn(); on_done(result) вызовется в главном потоке, если заявку не вытеснят."""
+        with self._cond:
+            self._generation += 1
+            self._pending = (self._generation, fn, on_done, on_error)
+            self._cond.notify()
+            gen = self._generation
+        self._schedule_poll()
+        return gen
+
+    def cancel(self) -> None:
+        """Отбросить ожидающую заявку и результат выполняющейся."""
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+
+    def close(self) -> None:
+        self.cancel()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._poll_id is not None:
+            try: self._widget.after_cancel(self._poll_id)
+            except Exception: pass
+            self._poll_id = None
+
+    # ---- фоновый поток ----
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job, self._pending = self._pending, None
+                self._busy = True
+            gen, fn, on_done, on_error = job
+            try:
+                res, err = fn(), None
+            except Exception as e:
+                res, err = None, e
+            with self._cond:
+                # кладём под замком, чтобы _poll не счёл работу законченной раньше времени
+                if gen == self._generation:
+                    self._results.put((gen, res, err, on_done, on_error))
+                self._busy = False
+
+    # ---- главный поток ----
+    def _schedule_poll(self) -> None:
+        if self._poll_id is None and not self._closed:
+            self._poll_id = self._widget.after(POLL_MS, self._poll)
+
+    def _poll(self) -> None:
+        self._poll_id = None
+        if self._closed:
+            return
+        latest = None
+        while True:
+            try:
+                latest = self._results.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            gen, res, err, on_done, on_error = latest
+            if gen == self._generation:   # за время ожидания могла прийти новая заявка
+                if err is None:
+                    on_done(res)
+                elif on_error is not None:
+                    on_error(err)
+        with self._cond:
+            more = self._busy or self._pending is not None or not self._results.empty()
+        if more:
+            self._schedule_poll()
@@ -4,6 +4,8 @@ from imgviewer.model import Model
 from imgviewer.controller import Controller
 from tkinter import simpledialog
 from imgviewer.ui import ImageCanvas, HistogramPanel, InfoPanel, ToolsPanel
+from imgviewer.ui.histogram_panel import EXACT_DELAY_MS
+from imgviewer.ui.image_canvas import REFINE_MS
 from imgviewer.ui.dialogs.adjust_bsc import AdjustBSCDialog
 from imgviewer.ui.dialogs.bw_levels import BWLevelsDialog
 from imgviewer.ui.dialogs.morphology import MorphologyDialog
@@ -19,6 +21,8 @@ class ImageViewer(tk.Tk):
         # модель/контроллер
         self.model = Model()
         self.ctrl = Controller(self.model)
+        self._info_id = None   # отложенная точная сводка после предпросмотра
+        self._view_id = None   # отложенная подстройка предпросмотра открытых диалогов под вид холста
 
         # Верхняя панель
         top = tk.Frame(self)
@@ -53,7 +57,8 @@ class ImageViewer(tk.Tk):
         # Поле изображения (виджет с собственным зумом)
         self.image_canvas = ImageCanvas(self.left, bg="#111", min_zoom=0.1, max_zoom=8.0, step=1.1)
         self.image_canvas.pack(expand=True, fill=tk.BOTH)
-        self.image_canvas.set_on_zoom(lambda z: self.title(f"MVP: Просмотр + сведения — {z:.2f}x"))
+        self.image_canvas.set_on_zoom(self._on_zoom)
+        self.image_canvas.set_on_view(self._on_view)
 
         # Правая панель (гистограмма + инфо + модификаторы)
         right = tk.Frame(self._paned)
@@ -145,9 +150,9 @@ class ImageViewer(tk.Tk):
 
         before = self.model.current
 
-        def on_preview(img):
-            self.ctrl.set_temp_image(img)
-            self._repaint()
+        def on_preview(img, scale=1.0):
+            self.ctrl.set_temp_image(img, scale)
+            self._repaint(interactive=True)
 
         def on_apply(op, kernel, iterations, mode):
             self.ctrl.set_temp_image(before)
@@ -158,7 +163,9 @@ class ImageViewer(tk.Tk):
             self.ctrl.set_temp_image(before)
             self._repaint()
 
-        self._morph_win = MorphologyDialog(self, before, on_preview, on_apply, on_cancel)
+        self._morph_win = MorphologyDialog(self, before, on_preview, on_apply, on_cancel,
+                                           preview_scale=self.image_canvas.preview_scale,
+                                           visible_region=self.image_canvas.visible_region)
 
     def open_filters_dialog(self):
         if not self.ctrl.has_image():
@@ -169,9 +176,9 @@ class ImageViewer(tk.Tk):
 
         before = self.model.current
 
-        def on_preview(img):
-            self.ctrl.set_temp_image(img)
-            self._repaint()
+        def on_preview(img, scale=1.0):
+            self.ctrl.set_temp_image(img, scale)
+            self._repaint(interactive=True)
 
         def on_apply(op, kernel, mode, normalize, extra):
             self.ctrl.set_temp_image(before)
@@ -183,7 +190,9 @@ class ImageViewer(tk.Tk):
             self._repaint()
 
         from imgviewer.ui.dialogs.filters import FiltersDialog
-        self._filters_win = FiltersDialog(self, before, on_preview, on_apply, on_cancel)
+        self._filters_win = FiltersDialog(self, before, on_preview, on_apply, on_cancel,
+                                          preview_scale=self.image_canvas.preview_scale,
+                                          visible_region=self.image_canvas.visible_region)
 
     # кнопки
     def _update_buttons(self):
@@ -202,14 +211,15 @@ class ImageViewer(tk.Tk):
     def _render_zoomed(self):
         if not self.ctrl.has_image():
             return
-        self.image_canvas.set_image(self.model.current)
+        self.image_canvas.set_image(self.model.current, scale=self.model.current_scale)
         self.title(f"MVP: Просмотр + сведения — {self.image_canvas.zoom:.2f}x")
 
-    def _repaint(self):
-        """Перерисовать картинку + инфо + гистограмму без обновления кнопок"""
+    def _repaint(self, interactive: bool = False):
+        """Перерисовать картинку + инфо + гистограмму без обновления кнопок.
+        interactive=True — идёт предпросмотр: гистограмма приближённая, точная — после паузы."""
         self._render_zoomed()
-        self._show_info()
-        self.hist_panel.redraw()
+        self._show_info(interactive=interactive)
+        self.hist_panel.redraw(interactive=interactive)
 
     def _refresh_all(self):
         """Полное обновление после операции."""
@@ -257,9 +267,34 @@ class ImageViewer(tk.Tk):
             self._show_info();
             self.hist_panel.redraw()
 
+    def _on_zoom(self, z: float):
+        self.title(f"MVP: Просмотр + сведения — {z:.2f}x")
+
+    def _on_view(self):
+        # предпросмотр следует за zoom и панорамой; пересчёт — когда колесо/перетаскивание остановилось
+        if self._view_id is not None:
+            self.after_cancel(self._view_id)
+        self._view_id = self.after(REFINE_MS, self._sync_preview_view)
+
+    def _sync_preview_view(self):
+        self._view_id = None
+        for name in ("_adj_win", "_bw_win", "_morph_win", "_filters_win"):
+            win = getattr(self, name, None)
+            if win is not None and tk.Toplevel.winfo_exists(win):
+                win.sync_view()
+
     # сводка о текущем изображении
-    def _show_info(self):
+    def _show_info(self, interactive: bool = False):
+        """interactive=True — идёт предпросмотр: статистика пересчитывается один раз,
+        после паузы (как точная гистограмма), а не на каждый кадр."""
+        if self._info_id is not None:
+            self.after_cancel(self._info_id)
+            self._info_id = None
         self.info_panel.set_text(self.ctrl.info_text())
+        if interactive:
+            self._info_id = self.after(EXACT_DELAY_MS, self._show_info)
+        else:
+            self.info_panel.set_stats(self.ctrl.stats_text())
 
     # сохранение
     def save_as(self):
@@ -296,9 +331,9 @@ class ImageViewer(tk.Tk):
 
         before = self.model.current
 
-        def on_preview(img):
-            self.ctrl.set_temp_image(img)
-            self._repaint()
+        def on_preview(img, scale=1.0):
+            self.ctrl.set_temp_image(img, scale)
+            self._repaint(interactive=True)
 
         def on_apply(b, s, c):
             self.ctrl.set_temp_image(before)
@@ -308,7 +343,9 @@ class ImageViewer(tk.Tk):
             self.ctrl.set_temp_image(before)
             self._repaint()
 
-        self._adj_win = AdjustBSCDialog(self, before, on_preview, on_apply, on_cancel, init=(1.0, 1.0, 1.0))
+        self._adj_win = AdjustBSCDialog(self, before, on_preview, on_apply, on_cancel, init=(1.0, 1.0, 1.0),
+                                        preview_scale=self.image_canvas.preview_scale,
+                                        visible_region=self.image_canvas.visible_region)
 
     def open_bw_dialog(self):
         if not self.ctrl.has_image():
@@ -319,9 +356,9 @@ class ImageViewer(tk.Tk):
 
         before = self.model.current
 
-        def on_preview(img):
-            self.ctrl.set_temp_image(img)
-            self._repaint()
+        def on_preview(img, scale=1.0):
+            self.ctrl.set_temp_image(img, scale)
+            self._repaint(interactive=True)
 
         def on_apply(black, white, gamma):
             self.ctrl.set_temp_image(before)
@@ -332,7 +369,9 @@ class ImageViewer(tk.Tk):
             self._repaint()
 
         self._bw_win = BWLevelsDialog(self, before, on_preview, on_apply, on_cancel,
-                                      init_black=0, init_white=255, init_gamma=1.0)
+                                      init_black=0, init_white=255, init_gamma=1.0,
+                                      preview_scale=self.image_canvas.preview_scale,
+                                      visible_region=self.image_canvas.visible_region)
 
     def apply_bw_levels(self, black, white, gamma):
         if self.ctrl.apply_bw_levels(black, white, gamma):
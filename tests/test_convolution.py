@@ -0,0 +1,150 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from PIL import Image
+
+from imgviewer.services import transforms as Sx
+from imgviewer.services.convolution import BACKENDS, convolve2d, convolve_u8
+
+# Паритет движка свёртки с эталоном transforms._convolve2d_single (медленный цикл по пикселям).
+# Эталон суммирует окно во float32 в своём порядке, поэтому у дробных ядер (нормированные,
+# motion) результат может отличаться на 1 в младшем разряде после отбрасывания дроби: сумма
+# вроде 99.99999 против 100.00001. Для целых ядер совпадение точное.
+
+RNG = np.random.default_rng(0)
+
+INT_KERNELS = {
+    "sharpen": Sx._sharpen_kernel(),
+    "emboss": Sx._emboss_kernel(),
+    "box3": np.ones((3, 3), dtype=np.float32),
+    "laplace5": np.array([[0, 0, -1, 0, 0],
+                          [0, -1, -2, -1, 0],
+                          [-1, -2, 16, -2, -1],
+                          [0, -1, -2, -1, 0],
+                          [0, 0, -1, 0, 0]], dtype=np.float32),
+}
+FLOAT_KERNELS = {
+    "gauss5": (np.outer([1, 4, 6, 4, 1], [1, 4, 6, 4, 1]) / 256.0).astype(np.float32),
+    "random7": RNG.normal(0, 0.2, (7, 7)).astype(np.float32),
+    "motion9": Sx._motion_kernel(9, 30.0),
+    "box9": np.full((9, 9), 1 / 81, dtype=np.float32),
+}
+# (h, w): обычный кадр, вытянутый и кадры меньше ядра
+SIZES = [(23, 31), (5, 40), (4, 3), (1, 6)]
+
+
+def _reference(img: Image.Image, kernel: np.ndarray, mode: str) -> np.ndarray:
+    """Исходный _convolve_image: эталонная свёртка по каналам, clip и отбрасывание дроби."""
+    def conv(ch):
+        return np.clip(Sx._convolve2d_single(ch.astype(np.float32), kernel), 0, 255).astype(np.uint8)
+
+    if mode == "L":
+        src = img.convert("L")
+        out = Image.fromarray(conv(np.asarray(src)), "L")
+        return np.asarray(out.convert(img.mode))
+    base = img if img.mode in ("RGB", "RGBA") else img.convert("RGB")
+    arr = np.asarray(base)
+    out = arr.copy()
+    for c in range(3):
+        out[:, :, c] = conv(arr[:, :, c])
+    return out
+
+
+def _image(mode: str, h: int, w: int) -> Image.Image:
+    bands = {"L": 1, "RGB": 3, "RGBA": 4}[mode]
+    arr = RNG.integers(0, 256, (h, w, bands), dtype=np.uint8)
+    return Image.fromarray(arr[:, :, 0] if bands == 1 else arr, mode)
+
+
+def _max_diff(a: np.ndarray, b: np.ndarray) -> int:
+    return int(np.abs(a.astype(np.int16) - b.astype(np.int16)).max())
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("name,kernel", list(INT_KERNELS.items()) + list(FLOAT_KERNELS.items()))
+@pytest.mark.parametrize("size", SIZES)
+def test_convolve2d_backends_match_reference(backend, name, kernel, size):
+    ch = RNG.integers(0, 256, size).astype(np.float32)
+    ref = Sx._convolve2d_single(ch, kernel)
+    got = convolve2d(ch, kernel, backend=backend)
+    assert got.dtype == np.float32 and got.shape == ref.shape
+    np.testing.assert_allclose(got, ref, rtol=0, atol=1e-3 * max(1.0, float(np.abs(ref).max())))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("name,kernel", list(INT_KERNELS.items()) + list(FLOAT_KERNELS.items()))
+def test_convolve_u8_matches_reference(backend, name, kernel):
+    src = RNG.integers(0, 256, (29, 37, 3), dtype=np.uint8)
+    ref = np.stack([np.clip(Sx._convolve2d_single(src[:, :, c].astype(np.float32), kernel), 0, 255)
+                    .astype(np.uint8) for c in range(3)], axis=2)
+    got = convolve_u8(src, kernel, backend=backend)
+    assert _max_diff(got, ref) <= (0 if name in INT_KERNELS else 1)
+
+
+def test_convolve_u8_strips_match_whole_frame(monkeypatch):
+    from imgviewer.services import convolution
+    src = RNG.integers(0, 256, (64, 50), dtype=np.uint8)
+    kernel = FLOAT_KERNELS["random7"]
+    whole = convolve_u8(src, kernel, backend="cv2")
+    monkeypatch.setattr(convolution, "STRIP_ELEMENTS", 50 * 5)   # полосы по 7 строк
+    assert np.array_equal(convolve_u8(src, kernel, backend="cv2"), whole)
+
+
+_FILTER_CASES = [
+    ("sharpen", None, False, {}),
+    ("emboss", None, False, {}),
+    ("motion", None, False, {"motion_len": 9, "motion_angle": 30.0}),
+    ("motion", None, False, {"motion_len": 5, "motion_angle": 90.0}),
+    ("custom", INT_KERNELS["laplace5"], False, {}),
+    ("custom", np.ones((3, 3), dtype=np.float32), True, {}),
+    ("custom", FLOAT_KERNELS["random7"], False, {}),
+    ("custom", None, False, {}),
+]
+
+
+def _kernel_for(op, kernel, normalize, extra):
+    if op == "sharpen":
+        return Sx._sharpen_kernel(), True
+    if op == "emboss":
+        return Sx._emboss_kernel(), True
+    if op == "motion":
+        return Sx._motion_kernel(extra["motion_len"], extra["motion_angle"]), False
+    if kernel is None:
+        k = np.zeros((3, 3), dtype=np.float32); k[1, 1] = 1.0
+        return k, True
+    k = np.asarray(kernel, dtype=np.float32)
+    if normalize and abs(float(k.sum())) > 1e-12:
+        k = k / k.sum()
+    return k, bool(np.all(k == np.round(k)))
+
+
+@pytest.mark.parametrize("img_mode", ["L", "RGB", "RGBA"])
+@pytest.mark.parametrize("mode", ["L", "RGB"])
+@pytest.mark.parametrize("op,kernel,normalize,extra", _FILTER_CASES)
+@pytest.mark.parametrize("size", [(23, 31), (4, 3)])
+@pytest.mark.parametrize("backend", ("auto",) + BACKENDS)
+def test_filter_apply_matches_reference(img_mode, mode, op, kernel, normalize, extra, size, backend):
+    img = _image(img_mode, *size)
+    k, exact = _kernel_for(op, kernel, normalize, extra)
+    got = Sx.filter_apply(img, op, kernel, mode, normalize, dict(extra, backend=backend))
+    ref = _reference(img, k, mode)
+    assert got.size == img.size
+    assert np.asarray(got).shape == ref.shape
+    assert _max_diff(np.asarray(got), ref) <= (0 if exact else 1)
+    if img_mode == "RGBA" and mode == "RGB":
+        assert np.array_equal(np.asarray(got)[:, :, 3], np.asarray(img)[:, :, 3])
+
+
+def test_fft_blocks_match_cv2_and_memory_is_bounded():
+    import tracemalloc
+    from imgviewer.services import convolution
+    ch = RNG.integers(0, 256, (1100, 1300)).astype(np.float32)
+    kernel = FLOAT_KERNELS["random7"]
+    ref = convolution._conv_cv2(ch, kernel)
+    tracemalloc.start()
+    got = convolution._conv_fft(ch, kernel)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    np.testing.assert_allclose(got, ref, rtol=0, atol=1e-2)
+    # выход float32 плюс буферы одного блока — без копии кадра с рамкой и float64-аккумулятора
+    assert peak < got.nbytes + (8 << 20)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from PIL import Image
+
+from imgviewer.services.histogram import _highbit, histogram_data
+
+# Гистограмма 16/32-битных и float-кадров: 256 столбцов равной ширины по [min, max] кадра,
+# уровень v попадает в столбец (v - min) * 256 // (max - min + 1) — сверяем с NumPy.
+
+RNG = np.random.default_rng(5)
+
+
+def _int_reference(a: np.ndarray):
+    a = a.astype(np.int64).ravel()
+    lo, hi = int(a.min()), int(a.max())
+    return np.bincount((a - lo) * 256 // (hi - lo + 1), minlength=256).tolist(), (lo, hi)
+
+
+@pytest.mark.parametrize("dtype", ["<u2", ">u2"])
+@pytest.mark.parametrize("lo,hi", [(0, 65535), (1000, 1300), (500, 500), (7, 200)])
+def test_highbit_i16(dtype, lo, hi):
+    a = RNG.integers(lo, hi + 1, (40, 50)).astype(dtype)
+    img = Image.fromarray(a)
+    assert img.mode.startswith("I;16")
+    data = _highbit(img)
+    hist, rng = _int_reference(a)
+    assert data["L"] == hist and data["range"] == rng and data["error"] == 0.0
+
+
+@pytest.mark.parametrize("lo,hi", [(-30000, 30000), (-5, 250), (100000, 100000)])   # узкий I
+def test_highbit_narrow_i(lo, hi):
+    a = RNG.integers(lo, hi + 1, (40, 50)).astype(np.int32)
+    data = _highbit(Image.fromarray(a))
+    hist, rng = _int_reference(a)
+    assert data["L"] == hist and data["range"] == rng
+
+
+@pytest.mark.parametrize("lo,hi", [(-2 ** 31, 2 ** 31 - 1), (0, 10 ** 6), (-70000, 0)])  # широкий I
+def test_highbit_wide_i(lo, hi):
+    a = RNG.integers(lo, hi, (40, 50), endpoint=True).astype(np.int32)
+    a.flat[:2] = lo, hi
+    data = _highbit(Image.fromarray(a))
+    hist, rng = _int_reference(a)
+    assert data["L"] == hist and data["range"] == rng
+
+
+@pytest.mark.parametrize("special", [False, True])
+def test_highbit_float(special):
+    a = RNG.normal(0.0, 3.0, (40, 50)).astype(np.float32)
+    if special:
+        a[::7, ::3] = np.nan
+        a[1, 1], a[2, 2] = np.inf, -np.inf
+    data = _highbit(Image.fromarray(a))
+    finite = a[np.isfinite(a)]
+    lo, hi = float(finite.min()), float(finite.max())
+    ref = np.floor((finite.astype(np.float64) - lo) * 256 / (hi - lo)).astype(np.int64)
+    ref = np.bincount(np.minimum(ref, 255), minlength=256).tolist()
+    assert data["range"] == (lo, hi)
+    assert sum(data["L"]) == finite.size
+    assert data["L"] == ref
+
+
+def test_highbit_float_degenerate():
+    nan = np.full((5, 6), np.nan, dtype=np.float32)
+    data = _highbit(Image.fromarray(nan))
+    assert data["L"] == [0] * 256 and data["range"] == (0.0, 0.0)
+    flat = _highbit(Image.fromarray(np.full((5, 6), 2.5, dtype=np.float32)))
+    assert flat["L"][0] == 30 and sum(flat["L"]) == 30 and flat["range"] == (2.5, 2.5)
+
+
+def test_histogram_data_routes_high_bit_modes():
+    a = RNG.integers(0, 4096, (30, 20)).astype(np.uint16)
+    assert histogram_data(Image.fromarray(a))["L"] == _int_reference(a)[0]
+
+
+def _cdf_distance(got, ref) -> float:
+    a, b = np.cumsum(got, dtype=np.float64), np.cumsum(ref, dtype=np.float64)
+    return float(np.abs(a / a[-1] - b / b[-1]).max())
+
+
+@pytest.mark.parametrize("mode", ["L", "RGB", "I;16"])
+@pytest.mark.parametrize("kind", ["noise", "gradient"])
+def test_sampled_histogram_within_error(mode, kind):
+    from imgviewer.services.histogram import SAMPLE_BUDGET, sampled_histogram
+    h, w = 300, 400                                   # больше бюджета выборки
+    assert h * w > SAMPLE_BUDGET
+    if kind == "noise":
+        arr = RNG.normal(120, 40, (h, w, 3)).clip(0, 255)
+    else:
+        arr = np.broadcast_to(np.linspace(0, 255, w)[None, :, None] * np.linspace(0.2, 1, h)[:, None, None],
+                              (h, w, 3))
+    if mode == "I;16":
+        img = Image.fromarray((arr[:, :, 0] * 200).astype(np.uint16))
+    elif mode == "L":
+        img = Image.fromarray(arr[:, :, 0].astype(np.uint8), "L")
+    else:
+        img = Image.fromarray(arr.astype(np.uint8), "RGB")
+    data = sampled_histogram(img)
+    exact = histogram_data(img.copy())
+    assert 0 < data["error"] < 0.01
+    for ch in ("L", "R", "G", "B"):
+        if exact[ch] is not None:
+            assert abs(sum(data[ch]) - h * w) <= 256    # столбцы пересчитаны на весь кадр
+            assert _cdf_distance(data[ch], exact[ch]) <= data["error"]
+
+
+def test_sampled_histogram_exact_when_small_or_known():
+    from imgviewer.services.histogram import sampled_histogram
+    small = Image.fromarray(RNG.integers(0, 256, (100, 120, 3), dtype=np.uint8), "RGB")
+    data = sampled_histogram(small)
+    assert data["error"] == 0.0 and data == histogram_data(small.copy())
+    big = Image.fromarray(RNG.integers(0, 256, (300, 400), dtype=np.uint8), "L")
+    assert sampled_histogram(big, budget=big.size[0] * big.size[1])["error"] == 0.0
+    exact = histogram_data(big)                       # уже посчитанная точная — без выборки
+    assert sampled_histogram(big) is exact
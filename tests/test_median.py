@@ -0,0 +1,49 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from PIL import Image, ImageFilter
+
+from imgviewer.services import median
+from imgviewer.services import transforms as Sx
+from imgviewer.services.median import median_filter
+
+# Медиана должна совпадать с PIL ImageFilter.MedianFilter (прежняя реализация) бит в бит:
+# и через cv2.medianBlur, и через гистограммный путь (LA, а также принудительно для всех).
+
+RNG = np.random.default_rng(3)
+MODES = ["L", "RGB", "RGBA", "LA"]
+SIZES = [3, 5, 9, 15]
+
+
+def _image(mode: str, h: int = 37, w: int = 29) -> Image.Image:
+    bands = len(mode) if mode != "RGBA" else 4
+    arr = RNG.integers(0, 256, (h, w, bands), dtype=np.uint8)
+    return Image.fromarray(arr[:, :, 0] if bands == 1 else arr, mode)
+
+
+def _reference(img: Image.Image, k: int) -> np.ndarray:
+    return np.asarray(img.filter(ImageFilter.MedianFilter(size=k)))
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("k", SIZES)
+def test_median_filter_matches_pil(mode, k):
+    img = _image(mode)
+    assert np.array_equal(median_filter(np.asarray(img), k), _reference(img, k))
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("k", SIZES)
+def test_histogram_median_matches_pil(monkeypatch, mode, k):
+    monkeypatch.setattr(median, "_cv2_supports", lambda arr, ksize: False)
+    img = _image(mode)
+    assert np.array_equal(median_filter(np.asarray(img), k), _reference(img, k))
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("k", [3, 9])
+def test_filter_apply_median_matches_pil(mode, k):
+    img = _image(mode, 70, 45)
+    got = Sx.filter_apply(img, "median", None, "RGB", False, {"median_size": k})
+    assert got.mode == img.mode
+    assert np.array_equal(np.asarray(got), _reference(img, k))
@@ -0,0 +1,23 @@
+from __future__ import annotations
+from PIL import Image
+
+from imgviewer.services import metadata as Smeta
+
+# Сведения о файле берутся из файла, а не из переданной (возможно, уже изменённой) картинки.
+
+
+def test_file_facts_come_from_file_not_from_derived_image(tmp_path):
+    path = str(tmp_path / "photo.jpg")
+    exif = Image.Exif()
+    exif[0x010F] = "TestCam"   # Make
+    Image.new("RGB", (40, 30), "red").save(path, exif=exif, dpi=(72, 72))
+    Smeta.clear_cache()
+
+    derived = Image.open(path).convert("L").rotate(10)   # как после правки: format=None, без EXIF
+    assert derived.format is None
+    facts = Smeta.file_facts(derived, path)
+    assert facts.fmt == "JPEG"
+    assert "Make: TestCam" in facts.exif_lines
+    assert facts.dpi is not None
+    # из кэша — те же сведения
+    assert Smeta.file_facts(derived, path) is facts
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import cv2
+import numpy as np
+import pytest
+
+from imgviewer.services import transforms as Sx
+from imgviewer.services.morphology import decompose_kernel, morph_rects
+
+# Разложение крупных пресетов на прямоугольники должно совпадать с OpenCV по исходному ядру
+# бит в бит (cv2.erode/dilate/morphologyEx, те же итерации и рамка). Пресеты строятся так же,
+# как в диалоге морфологии.
+
+RNG = np.random.default_rng(4)
+
+
+def _preset(name: str, r: int, c: int) -> np.ndarray:
+    k = np.zeros((r, c), dtype=np.uint8)
+    cy, cx = r // 2, c // 2
+    y, x = np.ogrid[:r, :c]
+    if name == "Квадрат":
+        k[:, :] = 1
+    elif name == "Крест":
+        k[cy, :] = 1
+        k[:, cx] = 1
+    elif name == "Эллипс":
+        ry, rx = max(1, r // 2), max(1, c // 2)
+        k[((y - cy) ** 2) / (ry ** 2) + ((x - cx) ** 2) / (rx ** 2) <= 1.0] = 1
+    elif name == "Ромб":
+        k[np.abs(y - cy) + np.abs(x - cx) <= max(r, c) // 2] = 1
+    return k
+
+
+def _reference(arr: np.ndarray, op: str, kernel: np.ndarray, iterations: int) -> np.ndarray:
+    kind, fn = Sx._MORPH_MAP[op]
+    if kind == "basic":
+        return fn(arr, kernel, iterations=iterations)
+    return cv2.morphologyEx(arr, fn, kernel, iterations=iterations)
+
+
+@pytest.mark.parametrize("name", ["Квадрат", "Крест", "Ромб", "Эллипс"])
+@pytest.mark.parametrize("shape", [(31, 31), (33, 45)])
+@pytest.mark.parametrize("op", sorted(Sx._MORPH_MAP))
+@pytest.mark.parametrize("iterations", [1, 2])
+@pytest.mark.parametrize("channels", [1, 3])
+def test_morph_rects_match_cv2(name, shape, op, iterations, channels):
+    kernel = _preset(name, *shape)
+    rects = decompose_kernel(kernel)
+    assert rects is not None
+    arr = RNG.integers(0, 256, (60, 70, channels), dtype=np.uint8)
+    if channels == 1:
+        arr = arr[:, :, 0]
+    got = morph_rects(arr, op, rects, iterations)
+    assert np.array_equal(got, _reference(arr, op, kernel, iterations))
+
+
+@pytest.mark.parametrize("kernel", [
+    np.ones((4, 5), dtype=np.uint8),                                     # чётный размер
+    np.pad(np.ones((31, 31), dtype=np.uint8), ((0, 0), (0, 2))),         # сдвинут от центра
+    1 - _preset("Ромб", 31, 31),                                         # пустой центр
+    (RNG.random((31, 31)) > 0.5).astype(np.uint8) | _preset("Крест", 31, 31),
+    np.vstack([_preset("Эллипс", 31, 31)[:16], np.ones((15, 31), dtype=np.uint8)]),  # несимметричный
+], ids=["even", "offcenter", "hollow", "random", "asymmetric"])
+def test_decompose_rejects_non_rect_union(kernel):
+    assert decompose_kernel(kernel) is None
+
+
+@pytest.mark.parametrize("op", sorted(Sx._MORPH_MAP))
+@pytest.mark.parametrize("size", [5, 31])
+def test_morph_apply_rgba_keeps_alpha(op, size):
+    from PIL import Image
+    arr = RNG.integers(0, 256, (50, 40, 4), dtype=np.uint8)
+    img = Image.fromarray(arr, "RGBA")
+    kernel = _preset("Эллипс", size, size)
+    got = Sx.morph_apply(img, op, kernel, 2, "RGB")
+    assert got.mode == "RGBA"
+    out = np.asarray(got)
+    assert np.array_equal(out[:, :, 3], arr[:, :, 3])
+    ref = _reference(np.ascontiguousarray(arr[:, :, :3]), op, kernel, 2)
+    assert np.array_equal(out[:, :, :3], ref)
@@ -0,0 +1,139 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from PIL import Image
+
+from imgviewer.services import transforms as Sx
+from imgviewer.services import preview
+from imgviewer.services.preview import PatchedImage, PreviewCache, PreviewProxy
+
+# Предпросмотр видимой области должен совпадать с той же областью обработанного целиком кадра:
+# ореол области берётся из transforms.morph_halo — тем же, что режет плитки в morph_apply.
+
+RNG = np.random.default_rng(1)
+REGION = (40, 30, 90, 70)
+
+
+@pytest.fixture(autouse=True)
+def _fine_grid(monkeypatch):
+    # кадры тестов маленькие: с сеткой по умолчанию область разрослась бы до целого кадра
+    monkeypatch.setattr(preview, "REGION_GRID", 8)
+
+
+def _image(mode: str, h: int = 120, w: int = 160) -> Image.Image:
+    bands = 1 if mode == "L" else 3
+    arr = RNG.integers(0, 256, (h, w, bands), dtype=np.uint8)
+    return Image.fromarray(arr[:, :, 0] if bands == 1 else arr, mode)
+
+
+@pytest.mark.parametrize("op", sorted(Sx._MORPH_MAP))
+@pytest.mark.parametrize("iterations", [1, 3])
+@pytest.mark.parametrize("mode", ["L", "RGB"])
+def test_region_morph_matches_full_frame(op, iterations, mode):
+    img = _image(mode)
+    kernel = np.ones((5, 5), dtype=np.uint8)
+    proxy = PreviewProxy(img, 1.0, cache=PreviewCache())
+    got = proxy.morph(op, kernel, iterations, mode, region=REGION)
+    assert isinstance(got, PatchedImage)
+    full = Sx.morph_apply(img, op, kernel, iterations, mode)
+    x0, y0, x1, y1 = REGION
+    assert np.array_equal(np.asarray(got)[y0:y1, x0:x1], np.asarray(full)[y0:y1, x0:x1])
+
+
+def test_morph_halo_unknown_op():
+    with pytest.raises(ValueError):
+        Sx.morph_halo("skeleton", (3, 3))
+
+
+@pytest.mark.parametrize("scale", [1.0, 0.4])
+@pytest.mark.parametrize("region", [None, REGION, (0, 0, 160, 120)])
+@pytest.mark.parametrize("mode", ["L", "RGB"])
+def test_levels_histogram_describes_shown_pixels(scale, region, mode):
+    from imgviewer.services.histogram import histogram_data
+    img = _image(mode)
+    proxy = PreviewProxy(img, scale, cache=PreviewCache())
+    shown = proxy.levels(30, 200, 0.8, region=region)
+    got = proxy.levels_histogram(30, 200, 0.8, region=region)
+    assert got["L"] == histogram_data(shown.copy())["L"]
+
+
+def test_rescaled_follows_zoom():
+    img = _image("RGB")
+    proxy = PreviewProxy(img, 0.25, cache=PreviewCache())
+    assert proxy.rescaled(0.25) is proxy
+    assert proxy.rescaled(3.0).scale == 1.0          # крупнее оригинала копия не бывает
+    finer = proxy.rescaled(0.5)
+    assert finer.image.size == (80, 60) and finer.cache is proxy.cache
+
+
+def _cross(n: int) -> np.ndarray:
+    k = np.zeros((n, n), dtype=np.uint8)
+    k[n // 2, :] = 1
+    k[:, n // 2] = 1
+    return k
+
+
+def _diamond(n: int) -> np.ndarray:
+    y, x = np.ogrid[:n, :n]
+    return (np.abs(y - n // 2) + np.abs(x - n // 2) <= n // 2).astype(np.uint8)
+
+
+@pytest.mark.parametrize("shape", [_cross, _diamond])
+@pytest.mark.parametrize("n", [9, 31])
+@pytest.mark.parametrize("scale", [0.1, 0.2, 0.3, 0.5, 0.75])
+def test_scaled_binary_kernel_keeps_lines(shape, n, scale):
+    from imgviewer.services.preview import _scale_binary_kernel, scale_size
+    k = _scale_binary_kernel(shape(n), scale)
+    m = scale_size(n, scale)
+    assert k.shape == (m, m)
+    assert k[m // 2, :].all() and k[:, m // 2].all()   # центральные строка и столбец целы
+
+
+@pytest.mark.parametrize("n", [9, 31])
+@pytest.mark.parametrize("scale", [0.2, 0.5])
+def test_scaled_float_kernel_keeps_weight(n, scale):
+    from imgviewer.services.preview import _scale_float_kernel
+    k = np.ones((n, n), dtype=np.float32)
+    k[:, : n // 2] = -1
+    k[:, n // 2] = 0                                  # нулевая сумма, как у ядер краёв
+    got = _scale_float_kernel(k, scale)
+    assert abs(float(got.sum())) < 1e-3
+    assert float(np.abs(got).sum()) == pytest.approx(float(np.abs(k).sum()), rel=0.25)
+    box = _scale_float_kernel(np.full((n, n), 1 / n ** 2, dtype=np.float32), scale)
+    assert float(box.sum()) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_region_preview_holds_only_patch(monkeypatch):
+    from imgviewer.services.histogram import histogram_data
+    monkeypatch.setattr(preview, "REGION_GRID", 128)
+    img = _image("RGB", 900, 1200)
+    cache = PreviewCache()
+    proxy = PreviewProxy(img, 1.0, cache=cache)
+    got = proxy.bsc(1.2, 0.7, 1.3, region=(300, 260, 700, 500))
+    assert isinstance(got, PatchedImage) and got.base is img
+    assert got.box == (256, 256, 768, 512)                  # наружу по сетке
+    assert cache.stats()["bytes"] == got.patch.size[0] * got.patch.size[1] * 3
+    data = histogram_data(got)                               # из гистограммы основы и куска
+    assert got._im is None                                   # кадр не собирался
+    whole = np.asarray(got)                                  # а по требованию собирается
+    assert data == histogram_data(Image.fromarray(whole))
+    x0, y0, x1, y1 = got.box
+    assert np.array_equal(whole[:y0], np.asarray(img)[:y0])
+    assert np.array_equal(whole[y0:y1, x0:x1], np.asarray(got.patch))
+    # сдвиг окна в пределах клетки сетки — тот же кусок из кэша
+    again = proxy.bsc(1.2, 0.7, 1.3, region=(310, 270, 705, 490))
+    assert again.patch is got.patch and cache.stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("scale", [1.0, 0.5, 0.3])
+def test_region_box_without_building_proxy(scale):
+    img = _image("L", 300, 400)
+    proxy = PreviewProxy(img, scale, cache=PreviewCache())
+    size = proxy.size
+    box = proxy.region_box((100, 90, 180, 150))
+    assert proxy._image is None                              # копия не строилась
+    assert size == proxy.image.size
+    sx, sy = size[0] / 400, size[1] / 300
+    assert box[0] <= 100 * sx and box[1] <= 90 * sy and box[2] >= 180 * sx and box[3] >= 150 * sy
+    assert all(v % 8 == 0 or v in size for v in box)         # по сетке или до края кадра
+    assert proxy.region_box(None) is None and proxy.region_box((0, 0, 400, 300)) is None
@@ -0,0 +1,65 @@
+from __future__ import annotations
+import json
+from PIL import Image
+
+from imgviewer.services import probe as P
+
+# probe читает только заголовки; битый файл — запись с error, а не исключение.
+
+
+def _files(tmp_path):
+    exif = Image.Exif()
+    exif[0x010F] = "TestCam"   # Make
+    paths = []
+    for i, (fmt, mode, size) in enumerate([("JPEG", "RGB", (40, 30)), ("PNG", "LA", (7, 9)),
+                                           ("TIFF", "I;16", (5, 4)), ("PNG", "RGBA", (12, 3))]):
+        path = tmp_path / f"{i}.{fmt.lower()}"
+        Image.new(mode, size).save(path, fmt, **({"exif": exif, "dpi": (300, 300)} if fmt == "JPEG" else {}))
+        paths.append(str(path))
+    return paths
+
+
+def test_probe_reads_header(tmp_path):
+    path = _files(tmp_path)[0]
+    rec = P.probe(path)
+    assert rec.error is None
+    assert (rec.format, rec.width, rec.height, rec.mode, rec.n_frames) == ("JPEG", 40, 30, "RGB", 1)
+    assert rec.dpi == (300.0, 300.0)
+    assert rec.exif == {"Make": "TestCam"}
+    assert rec.file_size == (tmp_path / "0.jpeg").stat().st_size
+
+
+def test_probe_unreadable_file(tmp_path):
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    rec = P.probe(str(broken))
+    assert rec.path == str(broken) and rec.file_size == 12
+    assert rec.error is not None and rec.width is None
+    missing = P.probe(str(tmp_path / "missing.jpg"))
+    assert missing.error.startswith("FileNotFoundError") and missing.file_size is None
+
+
+def test_probe_many_keeps_order(tmp_path):
+    paths = _files(tmp_path) * 5
+    paths.insert(3, str(tmp_path / "missing.png"))
+    recs = list(P.probe_many(paths, workers=4))
+    assert [r.path for r in recs] == paths
+    assert [r.error is not None for r in recs] == [p.endswith("missing.png") for p in paths]
+    assert [r.mode for r in recs[:3]] == ["RGB", "LA", "I;16"]
+
+
+def test_main_exit_status(tmp_path, capsys):
+    paths = _files(tmp_path)
+    (tmp_path / "notes.txt").write_text("skip me")      # не изображение — каталог его пропускает
+    assert P.main([str(tmp_path), "--workers", "2"]) == 0
+    lines = [json.loads(s) for s in capsys.readouterr().out.splitlines()]
+    assert [d["path"] for d in lines] == sorted(paths)
+    assert all(d["error"] is None for d in lines)
+
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "bad.jpg").write_bytes(b"\xff\xd8garbage")
+    assert P.main([str(tmp_path), "--no-recursive"]) == 0
+    capsys.readouterr()
+    assert P.main([str(tmp_path)]) == 1
+    lines = [json.loads(s) for s in capsys.readouterr().out.splitlines()]
+    assert len(lines) == 5 and lines[-1]["error"] is not None
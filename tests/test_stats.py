@@ -0,0 +1,71 @@
+from __future__ import annotations
+import math
+import numpy as np
+import pytest
+from PIL import Image
+
+from imgviewer.services.stats import DEFAULT_PERCENTILES, image_stats, stats_from_counts
+
+# Статистика по гистограмме обязана совпадать с NumPy по значениям пикселей: перцентили — как
+# numpy.percentile(..., method="inverted_cdf"), среднее и СКО (ddof=0) — с точностью float64.
+
+RNG = np.random.default_rng(6)
+PCTS = DEFAULT_PERCENTILES + (0.0, 50.0, 100.0, 33.3)
+
+
+def _frames():
+    rgb = RNG.integers(0, 256, (41, 37, 3), dtype=np.uint8)
+    f = RNG.normal(2.0, 5.0, (41, 37)).astype(np.float32)
+    f[::5, ::4] = np.nan
+    return {
+        "L": (Image.fromarray(rgb[:, :, 0], "L"), {"L": rgb[:, :, 0]}),
+        "RGB": (Image.fromarray(rgb, "RGB"), {c: rgb[:, :, i] for i, c in enumerate("RGB")}),
+        "I;16": (Image.fromarray(rgb[:, :, 0].astype(np.uint16) * 257 + 3), None),
+        "I narrow": (Image.fromarray(RNG.integers(-500, 9000, (41, 37)).astype(np.int32)), None),
+        "I wide": (Image.fromarray(RNG.integers(-2 ** 30, 2 ** 30, (41, 37)).astype(np.int32)), None),
+        "F": (Image.fromarray(f), None),
+    }
+
+
+def _check(got, values: np.ndarray):
+    v = values.ravel().astype(np.float64)
+    v = v[np.isfinite(v)]
+    assert got["count"] == v.size
+    assert got["mean"] == pytest.approx(v.mean(), rel=1e-9, abs=1e-9)
+    assert got["std"] == pytest.approx(v.std(), rel=1e-9, abs=1e-9)
+    assert (got["min"], got["max"]) == (v.min(), v.max())
+    assert got["median"] == np.percentile(v, 50, method="inverted_cdf")
+    for p, x in got["percentiles"].items():
+        assert x == np.percentile(v, p, method="inverted_cdf"), p
+
+
+@pytest.mark.parametrize("name", ["L", "RGB", "I;16", "I narrow", "I wide", "F"])
+def test_image_stats_matches_numpy(name):
+    img, channels = _frames()[name]
+    stats = image_stats(img, PCTS)
+    channels = channels or {"L": np.asarray(img)}
+    assert sorted(stats) == sorted(channels)
+    for ch, values in channels.items():
+        _check(stats[ch], values)
+    assert image_stats(img, PCTS) == stats            # повторный вызов — из памяти/гистограммы
+    assert set(stats[next(iter(stats))]["percentiles"]) == set(PCTS)
+
+
+def test_stats_from_counts_matches_numpy():
+    values = np.array([-3.0, 0.5, 2.0, 7.0, 11.0])
+    counts = np.array([4, 0, 9, 1, 6])
+    _check(stats_from_counts(counts, values, PCTS), np.repeat(values, counts))
+
+
+@pytest.mark.parametrize("img", [
+    Image.fromarray(np.full((6, 5), np.nan, dtype=np.float32)),
+    Image.fromarray(np.array([[np.inf, -np.inf]], dtype=np.float32)),
+    Image.new("L", (0, 0)),
+], ids=["all-nan", "all-inf", "empty"])
+def test_image_stats_without_values(img):
+    for s in image_stats(img).values():
+        assert s["count"] == 0
+        assert all(math.isnan(s[k]) for k in ("mean", "std", "min", "max", "median"))
+        assert all(math.isnan(v) for v in s["percentiles"].values())
+    empty = stats_from_counts([], [])
+    assert empty["count"] == 0 and math.isnan(empty["median"])
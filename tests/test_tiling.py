@@ -0,0 +1,79 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from PIL import Image
+
+from imgviewer.services import tiling
+from imgviewer.services import transforms as Sx
+from imgviewer.services.convolution import convolve_u8, plan_convolution
+from imgviewer.services.tiling import kernel_halo, run_tiled
+
+# Склейка тайлов должна давать тот же результат, что один тайл на весь кадр, бит в бит:
+# мелкие тайлы (меньше ядра с ореолом) и несколько потоков — самый жёсткий случай.
+
+RNG = np.random.default_rng(2)
+SRC = RNG.integers(0, 256, (75, 90, 3), dtype=np.uint8)
+KERNELS = {
+    "box5": np.ones((5, 5), dtype=np.float32),
+    "random7": RNG.normal(0, 0.2, (7, 7)).astype(np.float32),
+    "gauss9x3": np.outer([1, 2, 1, 2, 4, 2, 1, 2, 1], [1, 2, 1]).astype(np.float32) / 64,
+}
+
+
+def _whole_and_tiled(src, fn, halo, tile):
+    whole = run_tiled(src, fn, halo, tile=10 ** 6, workers=1)
+    tiled = run_tiled(src, fn, halo, tile=tile, workers=4)
+    return whole, tiled
+
+
+@pytest.mark.parametrize("name", sorted(KERNELS))
+@pytest.mark.parametrize("backend", ["cv2", "separable"])
+@pytest.mark.parametrize("tile", [4, 16, 33])
+def test_convolution_tiles_match_single_tile(name, backend, tile):
+    kernel = KERNELS[name]
+    backend, terms = plan_convolution(kernel, backend)
+    fn = lambda t: convolve_u8(t, kernel, backend=backend, terms=terms)
+    whole, tiled = _whole_and_tiled(SRC, fn, kernel_halo(kernel.shape), tile)
+    assert np.array_equal(whole, tiled)
+
+
+@pytest.mark.parametrize("op", sorted(Sx._MORPH_MAP))
+@pytest.mark.parametrize("iterations", [1, 3])
+@pytest.mark.parametrize("tile", [4, 16])
+def test_morph_tiles_match_single_tile(op, iterations, tile):
+    import cv2
+    kernel = np.ones((5, 3), dtype=np.uint8)
+    kind, fn = Sx._MORPH_MAP[op]
+    if kind == "basic":
+        morph = lambda t: fn(t, kernel, iterations=iterations)
+    else:
+        morph = lambda t: cv2.morphologyEx(t, fn, kernel, iterations=iterations)
+    whole, tiled = _whole_and_tiled(SRC, morph, Sx.morph_halo(op, kernel.shape, iterations), tile)
+    assert np.array_equal(whole, tiled)
+
+
+@pytest.mark.parametrize("op", sorted(Sx._MORPH_MAP))
+@pytest.mark.parametrize("iterations", [1, 3])
+@pytest.mark.parametrize("size", [5, 31])        # 31 — через разложение на прямоугольники
+def test_morph_apply_tiles_match_single_tile(monkeypatch, op, iterations, size):
+    img = Image.fromarray(SRC, "RGB")
+    y, x = np.ogrid[:size, :size]
+    kernel = (np.abs(y - size // 2) + np.abs(x - size // 2) <= size // 2).astype(np.uint8)
+    monkeypatch.setattr(tiling, "TILE_SIZE", 10 ** 6)
+    monkeypatch.setattr(tiling, "WORKERS", 1)
+    whole = Sx.morph_apply(img, op, kernel, iterations, "RGB")
+    monkeypatch.setattr(tiling, "TILE_SIZE", 16)
+    monkeypatch.setattr(tiling, "WORKERS", 4)
+    tiled = Sx.morph_apply(img, op, kernel, iterations, "RGB")
+    assert np.array_equal(np.asarray(whole), np.asarray(tiled))
+
+
+@pytest.mark.parametrize("name", sorted(KERNELS))
+def test_filter_apply_tiles_match_single_tile(monkeypatch, name):
+    img = Image.fromarray(SRC, "RGB")
+    monkeypatch.setattr(tiling, "TILE_SIZE", 10 ** 6)
+    whole = Sx.filter_apply(img, "custom", KERNELS[name], "RGB", False, {"backend": "cv2"})
+    monkeypatch.setattr(tiling, "TILE_SIZE", 8)
+    monkeypatch.setattr(tiling, "WORKERS", 3)
+    tiled = Sx.filter_apply(img, "custom", KERNELS[name], "RGB", False, {"backend": "cv2"})
+    assert np.array_equal(np.asarray(whole), np.asarray(tiled))
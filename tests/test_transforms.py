@@ -0,0 +1,41 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance
+
+from imgviewer.services import transforms as Sx
+
+# adjust_bsc обязан совпадать с цепочкой ImageEnhance.Brightness → Color → Contrast бит в бит.
+
+RNG = np.random.default_rng(2)
+
+
+def _image(mode: str, h: int, w: int) -> Image.Image:
+    bands = {"L": 1, "RGB": 3, "RGBA": 4}[mode]
+    arr = RNG.integers(0, 256, (h, w, bands), dtype=np.uint8)
+    return Image.fromarray(arr[:, :, 0] if bands == 1 else arr, mode)
+
+
+def _enhance(img, b, s, c):
+    out = ImageEnhance.Color(ImageEnhance.Brightness(img).enhance(b)).enhance(s)
+    return ImageEnhance.Contrast(out).enhance(c)
+
+
+@pytest.mark.parametrize("mode", ["L", "RGB", "RGBA"])
+@pytest.mark.parametrize("size", [(1, 1), (37, 53), (900, 700)])   # последний — несколько полос
+@pytest.mark.parametrize("b,s,c", [(1.0, 1.0, 1.0), (1.3, 1.0, 1.0), (1.0, 1.0, 0.6), (0.7, 1.0, 1.4),
+                                   (1.0, 0.0, 1.0), (1.2, 0.5, 1.0), (0.8, 1.7, 1.3), (1.0, 0.4, 0.5)])
+def test_adjust_bsc_matches_image_enhance(mode, size, b, s, c):
+    img = _image(mode, *size)
+    got = Sx.adjust_bsc(img, b, s, c)
+    assert got is not img
+    assert got.mode == img.mode
+    assert np.array_equal(np.asarray(got), np.asarray(_enhance(img, b, s, c)))
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA"])
+def test_adjust_bsc_with_given_mean(mode):
+    img = _image(mode, 120, 90)
+    mean = Sx.contrast_mean(img, 1.1, 0.6)
+    got = Sx.adjust_bsc(img, 1.1, 0.6, 1.5, mean=mean)
+    assert np.array_equal(np.asarray(got), np.asarray(_enhance(img, 1.1, 0.6, 1.5)))